@@ -0,0 +1,50 @@
+"""add notification counters
+
+Revision ID: 6f0b3c91e2a4
+Revises: d550ca0a9a67
+Create Date: 2026-10-18 13:20:41.902117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f0b3c91e2a4'
+down_revision: Union[str, Sequence[str], None] = 'd550ca0a9a67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'notification_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('unread_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('read_through_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+    # seed every existing user's counter from what is unread today
+    op.execute("""
+        INSERT INTO notification_counters (user_id, unread_count)
+        SELECT u.id,
+               (SELECT count(*) FROM notifications n
+                 WHERE n.recipient_id = u.id AND NOT coalesce(n.is_read, false))
+             + (SELECT count(*) FROM broadcast_notifications b
+                 LEFT JOIN broadcast_receipts r ON r.broadcast_id = b.id AND r.user_id = u.id
+                 WHERE (b.role = u.role
+                        OR b.batch_id IN (SELECT e.batch_id FROM enrollments e
+                                           WHERE e.student_id = u.id AND e.is_active))
+                   AND r.read_at IS NULL AND r.dismissed_at IS NULL)
+        FROM users u
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('notification_counters')
@@ -0,0 +1,98 @@
+"""partition notifications by month
+
+Revision ID: a3e8d5f2c7b1
+Revises: 6f0b3c91e2a4
+Create Date: 2026-10-18 14:05:12.337480
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e8d5f2c7b1'
+down_revision: Union[str, Sequence[str], None] = '6f0b3c91e2a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, recipient_id, title, message, channel, is_read, created_at"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE notifications RENAME TO notifications_unpartitioned")
+    op.execute("ALTER TABLE notifications_unpartitioned RENAME CONSTRAINT notifications_pkey TO notifications_unpartitioned_pkey")
+    op.execute("ALTER TABLE notifications_unpartitioned RENAME CONSTRAINT notifications_recipient_id_fkey TO notifications_unpartitioned_recipient_id_fkey")
+    op.execute("DROP INDEX IF EXISTS ix_notifications_id")
+    op.execute("DROP INDEX IF EXISTS ix_notifications_recipient_id")
+
+    op.execute("""
+        CREATE TABLE notifications (
+            id INTEGER NOT NULL DEFAULT nextval('notifications_id_seq'),
+            recipient_id INTEGER NOT NULL REFERENCES users (id),
+            title VARCHAR,
+            message TEXT NOT NULL,
+            channel VARCHAR,
+            is_read BOOLEAN,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT notifications_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE INDEX ix_notifications_id ON notifications (id)")
+    op.execute("CREATE INDEX ix_notifications_recipient_created ON notifications (recipient_id, created_at)")
+
+    # one partition per month from the oldest row up to a few months ahead;
+    # app.db.partitions keeps creating them from here on
+    op.execute("""
+        DO $$
+        DECLARE
+            m date;
+            last date := (date_trunc('month', now()) + interval '3 months')::date;
+        BEGIN
+            SELECT date_trunc('month', coalesce(min(created_at), now()))::date INTO m FROM notifications_unpartitioned;
+            WHILE m <= last LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF notifications FOR VALUES FROM (%L) TO (%L)',
+                    'notifications_y' || to_char(m, 'YYYY') || 'm' || to_char(m, 'MM'),
+                    m, (m + interval '1 month')::date
+                );
+                m := (m + interval '1 month')::date;
+            END LOOP;
+        END $$
+    """)
+
+    op.execute(f"""
+        INSERT INTO notifications ({COLUMNS})
+        SELECT id, recipient_id, title, message, channel, is_read, coalesce(created_at, now())
+        FROM notifications_unpartitioned
+    """)
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id")
+    op.execute("DROP TABLE notifications_unpartitioned")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE notifications RENAME TO notifications_partitioned")
+    op.execute("ALTER TABLE notifications_partitioned RENAME CONSTRAINT notifications_pkey TO notifications_partitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_notifications_id")
+    op.execute("DROP INDEX IF EXISTS ix_notifications_recipient_created")
+
+    op.execute("""
+        CREATE TABLE notifications (
+            id INTEGER NOT NULL DEFAULT nextval('notifications_id_seq'),
+            recipient_id INTEGER NOT NULL REFERENCES users (id),
+            title VARCHAR,
+            message TEXT NOT NULL,
+            channel VARCHAR,
+            is_read BOOLEAN,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            CONSTRAINT notifications_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("CREATE INDEX ix_notifications_id ON notifications (id)")
+    op.execute("CREATE INDEX ix_notifications_recipient_id ON notifications (recipient_id)")
+
+    op.execute(f"INSERT INTO notifications ({COLUMNS}) SELECT {COLUMNS} FROM notifications_partitioned")
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id")
+    op.execute("DROP TABLE notifications_partitioned")
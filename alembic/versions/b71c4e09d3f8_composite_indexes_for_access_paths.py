@@ -0,0 +1,112 @@
+"""composite indexes for access paths
+
+Revision ID: b71c4e09d3f8
+Revises: a3e8d5f2c7b1
+Create Date: 2026-10-18 15:12:48.220931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71c4e09d3f8'
+down_revision: Union[str, Sequence[str], None] = 'a3e8d5f2c7b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# notifications(recipient_id, created_at) already came with the partitioning
+# migration; CONCURRENTLY does not work on a partitioned parent anyway.
+INDEXES = [
+    ("uq_enrollments_batch_student", "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_enrollments_batch_student ON enrollments (batch_id, student_id) INCLUDE (is_active)"),
+    ("ix_enrollments_student_active", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_enrollments_student_active ON enrollments (student_id, is_active, batch_id)"),
+    ("ix_contents_batch_created", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contents_batch_created ON contents (batch_id, created_at, id)"),
+    ("ix_comments_content_public_created", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_comments_content_public_created ON comments (content_id, is_public, created_at, id)"),
+    ("uq_batch_teacher", "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_batch_teacher ON batch_teachers (batch_id, teacher_id)"),
+    ("ix_batch_teachers_teacher_id", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_batch_teachers_teacher_id ON batch_teachers (teacher_id)"),
+    ("uq_timetable_slot_class_start", "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_timetable_slot_class_start ON timetable_slots (class_id, day, start_time)"),
+    ("ix_timetable_slots_teacher_day_start", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_timetable_slots_teacher_day_start ON timetable_slots (teacher_id, day, start_time)"),
+]
+
+# single column indexes that are now a prefix of one of the above
+REPLACED = [
+    ("ix_enrollments_batch_id", "enrollments (batch_id)"),
+    ("ix_enrollments_student_id", "enrollments (student_id)"),
+    ("ix_contents_batch_id", "contents (batch_id)"),
+    ("ix_comments_content_id", "comments (content_id)"),
+    ("ix_timetable_slots_class_id", "timetable_slots (class_id)"),
+    ("ix_timetable_slots_teacher_id", "timetable_slots (teacher_id)"),
+]
+
+# Rows the route code used to reject by hand but could still race in. Which
+# copy to keep is not something a migration should guess, so duplicates stop
+# the upgrade with the offending keys and the query that lists them all.
+DUPLICATES = [
+    ("enrollments", "batch_id, student_id"),
+    ("batch_teachers", "batch_id, teacher_id"),
+    ("timetable_slots", "class_id, day, start_time"),
+]
+
+
+def check_duplicates():
+    problems = []
+    for table, keys in DUPLICATES:
+        query = f"SELECT {keys}, count(*) FROM {table} GROUP BY {keys} HAVING count(*) > 1"
+        rows = op.get_bind().execute(sa.text(f"{query} ORDER BY {keys} LIMIT 20")).all()
+        if rows:
+            listed = "\n".join(f"    ({', '.join(map(str, row[:-1]))}): {row[-1]} rows" for row in rows)
+            problems.append(f"{table} ({keys}):\n{listed}\n  all of them: {query}")
+
+    if problems:
+        raise RuntimeError("Duplicate rows block the new unique indexes, resolve them and rerun:\n" + "\n".join(problems))
+
+
+INVALID_INDEX = sa.text(
+    "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name AND NOT i.indisvalid"
+)
+
+CONSTRAINT_EXISTS = sa.text("SELECT 1 FROM pg_constraint WHERE conname = :name AND conrelid = CAST(:table AS regclass)")
+
+# unique indexes above that become constraints, as (table, name)
+CONSTRAINTS = [
+    ("batch_teachers", "uq_batch_teacher"),
+    ("timetable_slots", "uq_timetable_slot_class_start"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    check_duplicates()
+
+    with op.get_context().autocommit_block():
+        for name, statement in INDEXES:
+            # a failed concurrent build leaves an INVALID index behind that
+            # IF NOT EXISTS would happily skip over on the next attempt
+            if op.get_bind().execute(INVALID_INDEX, {"name": name}).first():
+                op.execute(f"DROP INDEX CONCURRENTLY {name}")
+            op.execute(statement)
+
+    # a rerun after a partial failure finds some of these already in place
+    for table, name in CONSTRAINTS:
+        if not op.get_bind().execute(CONSTRAINT_EXISTS, {"name": name, "table": table}).first():
+            op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}")
+
+    with op.get_context().autocommit_block():
+        for name, _ in REPLACED:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, columns in REPLACED:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {columns}")
+
+    for table, name in reversed(CONSTRAINTS):
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
+
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
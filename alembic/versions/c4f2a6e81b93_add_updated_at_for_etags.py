@@ -0,0 +1,33 @@
+"""add updated_at for etags
+
+Revision ID: c4f2a6e81b93
+Revises: b71c4e09d3f8
+Create Date: 2026-10-18 16:31:07.118254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f2a6e81b93'
+down_revision: Union[str, Sequence[str], None] = 'b71c4e09d3f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ['batches', 'contents', 'comments', 'teachers', 'timetable_slots']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # now() is stable, so this is a metadata-only change, no table rewrite
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,67 @@
+"""add broadcast notifications
+
+Revision ID: d550ca0a9a67
+Revises: d212ae779eb5
+Create Date: 2026-10-18 11:02:14.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd550ca0a9a67'
+down_revision: Union[str, Sequence[str], None] = 'd212ae779eb5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    audience = postgresql.ENUM('batch', 'role', name='audienceenum')
+    audience.create(op.get_bind(), checkfirst=True)
+
+    op.create_table(
+        'broadcast_notifications',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('audience', postgresql.ENUM(name='audienceenum', create_type=False), nullable=False),
+        sa.Column('batch_id', sa.Integer(), nullable=True),
+        sa.Column('role', postgresql.ENUM(name='roleenum', create_type=False), nullable=True),
+        sa.Column('sender_id', sa.Integer(), nullable=True),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('channel', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['batch_id'], ['batches.id']),
+        sa.ForeignKeyConstraint(['sender_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_broadcast_notifications_id', 'broadcast_notifications', ['id'])
+    op.create_index('ix_broadcast_notifications_sender_id', 'broadcast_notifications', ['sender_id'])
+    op.create_index('ix_broadcast_notifications_batch_created', 'broadcast_notifications', ['batch_id', 'created_at'])
+    op.create_index('ix_broadcast_notifications_role_created', 'broadcast_notifications', ['role', 'created_at'])
+
+    op.create_table(
+        'broadcast_receipts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('broadcast_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('read_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('dismissed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['broadcast_id'], ['broadcast_notifications.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('broadcast_id', 'user_id', name='uq_broadcast_receipt_user'),
+    )
+    op.create_index('ix_broadcast_receipts_id', 'broadcast_receipts', ['id'])
+    op.create_index('ix_broadcast_receipts_user_id', 'broadcast_receipts', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('broadcast_receipts')
+    op.drop_table('broadcast_notifications')
+    postgresql.ENUM(name='audienceenum').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,46 @@
+"""add batch deletions
+
+Revision ID: e83b5d17c4a2
+Revises: c4f2a6e81b93
+Create Date: 2026-10-18 18:04:52.630914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e83b5d17c4a2'
+down_revision: Union[str, Sequence[str], None] = 'c4f2a6e81b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'batch_deletions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('batch_id', sa.Integer(), nullable=False),
+        sa.Column('requested_by', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('step', sa.String(), nullable=True),
+        sa.Column('progress', sa.JSON(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['requested_by'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_batch_deletions_id', 'batch_deletions', ['id'])
+    op.create_index('ix_batch_deletions_batch_id', 'batch_deletions', ['batch_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_batch_deletions_batch_id', table_name='batch_deletions')
+    op.drop_index('ix_batch_deletions_id', table_name='batch_deletions')
+    op.drop_table('batch_deletions')
@@ -0,0 +1,64 @@
+"""time typed timetable slots with overlap exclusion
+
+Revision ID: f1c9a7d25e46
+Revises: e83b5d17c4a2
+Create Date: 2026-10-18 19:26:13.475208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c9a7d25e46'
+down_revision: Union[str, Sequence[str], None] = 'e83b5d17c4a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# keep in step with app.models.models.slot_period
+PERIOD = "tsrange(DATE '2000-01-01' + start_time, DATE '2000-01-01' + end_time)"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    # an exact start clash is an overlap too, so the class exclusion below
+    # replaces it; dropped first so the type change has one index less to rebuild
+    op.execute("ALTER TABLE timetable_slots DROP CONSTRAINT IF EXISTS uq_timetable_slot_class_start")
+
+    # strings like '9:00' or '09:00:00' cast fine; anything that does not
+    # parse as a time of day stops the migration so it can be fixed by hand
+    op.execute("""
+        ALTER TABLE timetable_slots
+            ALTER COLUMN start_time TYPE time USING trim(start_time)::time,
+            ALTER COLUMN end_time TYPE time USING trim(end_time)::time
+    """)
+    op.execute("ALTER TABLE timetable_slots ADD CONSTRAINT ck_timetable_slots_time_order CHECK (end_time > start_time)")
+
+    # already overlapping slots make these fail with the two conflicting keys
+    # in the error, which is the list of rows to sort out first
+    op.execute(f"""
+        ALTER TABLE timetable_slots ADD CONSTRAINT ex_timetable_slots_teacher_overlap
+            EXCLUDE USING gist (teacher_id WITH =, day WITH =, {PERIOD} WITH &&) DEFERRABLE INITIALLY DEFERRED
+    """)
+    op.execute(f"""
+        ALTER TABLE timetable_slots ADD CONSTRAINT ex_timetable_slots_class_overlap
+            EXCLUDE USING gist (class_id WITH =, day WITH =, {PERIOD} WITH &&) DEFERRABLE INITIALLY DEFERRED
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_timetable_slots_class_day_start ON timetable_slots (class_id, day, start_time)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_timetable_slots_class_day_start")
+    op.execute("ALTER TABLE timetable_slots DROP CONSTRAINT IF EXISTS ex_timetable_slots_class_overlap")
+    op.execute("ALTER TABLE timetable_slots DROP CONSTRAINT IF EXISTS ex_timetable_slots_teacher_overlap")
+    op.execute("ALTER TABLE timetable_slots DROP CONSTRAINT IF EXISTS ck_timetable_slots_time_order")
+
+    op.execute("""
+        ALTER TABLE timetable_slots
+            ALTER COLUMN start_time TYPE varchar USING to_char(start_time, 'HH24:MI'),
+            ALTER COLUMN end_time TYPE varchar USING to_char(end_time, 'HH24:MI')
+    """)
+    op.execute("ALTER TABLE timetable_slots ADD CONSTRAINT uq_timetable_slot_class_start UNIQUE (class_id, day, start_time)")
@@ -1,28 +1,131 @@
-from fastapi import Depends, HTTPException
+import hashlib
+import time
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
-from firebase_admin import auth as firebase_auth
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.identity import CurrentUser, identity_cache
+from app.core.signing_keys import signing_keys
+from app.core.stream_tickets import redeem_ticket
+from app.db.session import SessionLocal, get_async_db, get_db
 from app.models.models import users
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
-def get_current_user(credentials = Depends(security),db: Session = Depends(get_db)):
-    
-    token = credentials.credentials
+token_cache = TTLCache(max_size=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
 
-    try:
-        decoded = firebase_auth.verify_id_token(token)
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+def verify_token(token: str):
+    key = hashlib.sha256(token.encode()).hexdigest()
+
+    decoded = token_cache.get(key)
+    if decoded is not None:
+        return decoded
+
+    decoded = signing_keys.verify_id_token(token)
+
+    # never serve claims past the token's own expiry
+    token_cache.set(key, decoded, ttl=decoded.get("exp", 0) - time.time())
+    return decoded
+
+
+# For async handlers: a cache hit stays on the loop, anything that may have to
+# fetch signing keys runs in the threadpool.
+async def async_verify_token(token: str):
+    decoded = token_cache.get(hashlib.sha256(token.encode()).hexdigest())
+    if decoded is not None:
+        return decoded
+    return await run_in_threadpool(verify_token, token)
+
+
+def token_uid(decoded):
     firebase_uid = decoded.get("uid")
     if not firebase_uid:
         raise HTTPException(status_code=401, detail="Invalid Firebase token")
+    return firebase_uid
+
+
+# The caller's verified uid, or None without a valid bearer token. Only used
+# to route reads, so a bad token is not an error here.
+def request_uid(request: Request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return verify_token(token).get("uid")
+    except Exception:
+        return None
+
+
+def resolve_user(token: str, db: Session):
+    try:
+        decoded = verify_token(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    return load_identity(token_uid(decoded), db)
+
+
+def load_identity(firebase_uid: str, db: Session):
+    identity = identity_cache.get(firebase_uid)
+    if identity is not None:
+        return identity
 
     user = db.query(users).filter(users.firebase_uid == firebase_uid).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return user
+    identity = CurrentUser.from_row(user)
+    identity_cache.set(firebase_uid, identity)
+    return identity
+
+
+def get_current_user(credentials = Depends(security),db: Session = Depends(get_db)):
+    identity = resolve_user(credentials.credentials, db)
+    db.info["writer_key"] = identity.firebase_uid
+    return identity
+
+
+# Same as get_current_user for the async handlers, on the AsyncSession, so a
+# request never takes a threadpool thread or a sync pool connection.
+async def async_get_current_user(credentials = Depends(security), db = Depends(get_async_db)):
+    try:
+        decoded = await async_verify_token(credentials.credentials)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    firebase_uid = token_uid(decoded)
+    db.info["writer_key"] = firebase_uid
+    identity = identity_cache.get(firebase_uid)
+    if identity is not None:
+        return identity
+
+    user = (await db.scalars(select(users).where(users.firebase_uid == firebase_uid))).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    identity = CurrentUser.from_row(user)
+    identity_cache.set(firebase_uid, identity)
+    return identity
+
+
+# EventSource clients cannot set headers, so streams take a single use
+# ticket from POST /notifications/stream-ticket instead of the ID token; the
+# session is not held for the stream
+def get_stream_user(ticket: Optional[str] = None, credentials = Depends(optional_security)):
+    if credentials:
+        with SessionLocal() as db:
+            return resolve_user(credentials.credentials, db)
+
+    firebase_uid = redeem_ticket(ticket) if ticket else None
+    if not firebase_uid:
+        raise HTTPException(status_code=401, detail="Not authenticated")
 
+    with SessionLocal() as db:
+        return load_identity(firebase_uid, db)
@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    # get and invalidate in one step, for entries that may only be used once
+    def pop(self, key, default=None):
+        with self._lock:
+            value, expires_at = self._data.pop(key, (default, None))
+            if expires_at is None or expires_at <= time.monotonic():
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# The shared counterpart of TTLCache for caches every worker has to agree on.
+# Values go through dumps/loads, so each cache decides its own encoding.
+class RedisCache:
+    def __init__(self, url: str, ttl: int, prefix: str, dumps=json.dumps, loads=json.loads):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.dumps = dumps
+        self.loads = loads
+        self.hits = 0
+        self.misses = 0
+
+    def _hit(self, raw, default):
+        if raw is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return self.loads(raw)
+
+    def get(self, key, default=None):
+        return self._hit(self.client.get(self.prefix + str(key)), default)
+
+    def set(self, key, value, ttl: float = None):
+        self.client.set(self.prefix + str(key), self.dumps(value), ex=int(ttl or self.ttl))
+
+    # GET and DEL in one MULTI, so only one caller ever gets the value
+    def pop(self, key, default=None):
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + str(key))
+        pipe.delete(self.prefix + str(key))
+        raw, _ = pipe.execute()
+        return self._hit(raw, default)
+
+    def invalidate(self, key):
+        self.client.delete(self.prefix + str(key))
+
+    # one DEL for all of them rather than a round trip each
+    def invalidate_many(self, keys):
+        keys = [self.prefix + str(key) for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -1,7 +1,60 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None
+    ASYNC_DB_ENABLED: bool = False
+
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    READ_REPLICA_URL: Optional[str] = None
+    READ_REPLICA_STICKY_SECONDS: int = 5
+    READ_REPLICA_STICKY_SIZE: int = 10000
+
+    JOB_WORKERS: int = 2
+    JOB_STALE_SECONDS: int = 300
+    JOB_RESUME_INTERVAL: int = 60
+    NOTIFICATION_FANOUT_JOB_THRESHOLD: int = 5000
+    NOTIFICATION_STREAM_HEARTBEAT: int = 20
+    STREAM_TICKET_TTL: int = 30
+    STREAM_TICKET_CACHE_SIZE: int = 10000
+    NOTIFICATION_RETENTION_MONTHS: int = 12
+    NOTIFICATION_PARTITIONS_AHEAD: int = 3
+    NOTIFICATION_ARCHIVE_SCHEMA: Optional[str] = "archive"
+    PARTITION_MAINTENANCE_INTERVAL: int = 3600
+    EXPORT_CHUNK_SIZE: int = 1000
+    IMPORT_CHUNK_SIZE: int = 5000
+    IMPORT_SPOOL_BYTES: int = 8 * 1024 * 1024
+    IMPORT_MAX_ERRORS: int = 1000
+    BATCH_DELETE_CHUNK_SIZE: int = 5000
+    BATCH_DELETE_STALE_SECONDS: int = 300
+    BATCH_DELETE_RESUME_INTERVAL: int = 60
+
+    DEBUG: bool = False
+    N_PLUS_ONE_THRESHOLD: int = 10
+
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL: int = 300
+
+    FIREBASE_PROJECT_ID: Optional[str] = None
+    FIREBASE_JWKS_URL: str = "https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com"
+    FIREBASE_JWKS_FILE: Optional[str] = None
+    FIREBASE_KEY_REFRESH_MARGIN: int = 300
+    FIREBASE_CLOCK_SKEW: int = 0
+
+    IDENTITY_CACHE_SIZE: int = 10000
+    IDENTITY_CACHE_TTL: int = 60
+    MEMBERSHIP_CACHE_SIZE: int = 10000
+    MEMBERSHIP_CACHE_TTL: int = 60
+    CONTENT_LIST_CACHE_SIZE: int = 2000
+    CONTENT_LIST_CACHE_TTL: int = 60
+    REDIS_URL: Optional[str] = None
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,109 @@
+from sqlalchemy import and_, event, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.partitions import retention_cutoff
+from app.models.models import broadcast_notifications, broadcast_receipts, enrollments, notification_counters, notifications, users
+
+
+def read_through(user_id: int):
+    return select(notification_counters.read_through_at).where(notification_counters.user_id == user_id).scalar_subquery()
+
+
+# anything at or before the user's watermark counts as read
+def below_watermark(watermark, created_at):
+    return and_(watermark.isnot(None), created_at <= watermark)
+
+
+# A lower bound on created_at lets Postgres prune old partitions at execution
+# time. It is the retention cutoff, so the list, the recount and the
+# maintained counters (settled when a partition retires) cover the same rows.
+def recent_notifications():
+    return notifications.created_at >= retention_cutoff(settings.NOTIFICATION_RETENTION_MONTHS)
+
+
+def visible_broadcasts(user_id, role):
+    my_batches = select(enrollments.batch_id).where(enrollments.student_id == user_id,enrollments.is_active == True,).correlate_except(enrollments)
+    return or_(broadcast_notifications.batch_id.in_(my_batches), broadcast_notifications.role == role)
+
+
+def with_receipt(user_id: int):
+    return and_(broadcast_receipts.broadcast_id == broadcast_notifications.id, broadcast_receipts.user_id == user_id)
+
+
+# user_id, role and watermark may be values or columns of an outer statement,
+# which is how recount_counters recounts many users in one UPDATE
+def unread_count_query(user_id, role, watermark):
+    direct = select(func.count()).select_from(notifications).where(
+        notifications.recipient_id == user_id,
+        notifications.is_read.isnot(True),
+        ~below_watermark(watermark, notifications.created_at),
+        recent_notifications(),
+    )
+    broadcasts = (
+        select(func.count())
+        .select_from(broadcast_notifications)
+        .outerjoin(broadcast_receipts, with_receipt(user_id))
+        .where(
+            visible_broadcasts(user_id, role),
+            broadcast_receipts.read_at.is_(None),
+            broadcast_receipts.dismissed_at.is_(None),
+            ~below_watermark(watermark, broadcast_notifications.created_at),
+        )
+    )
+    return direct.scalar_subquery() + broadcasts.scalar_subquery()
+
+
+def recount_unread(db: Session, user):
+    stmt = pg_insert(notification_counters).values(user_id=user.id, unread_count=unread_count_query(user.id, user.role, read_through(user.id)))
+    return db.execute(
+        stmt.on_conflict_do_update(index_elements=[notification_counters.user_id], set_={"unread_count": stmt.excluded.unread_count})
+        .returning(notification_counters.unread_count, notification_counters.read_through_at)
+    ).one()
+
+
+# Counters are only bumped for users that already have a row; a missing row
+# is filled in with an exact count the first time the user asks for it.
+def bump_unread(db: Session, recipients):
+    db.execute(
+        update(notification_counters)
+        .where(notification_counters.user_id.in_(recipients))
+        .values(unread_count=notification_counters.unread_count + 1)
+    )
+
+
+def drop_unread(db: Session, recipients, created_at):
+    db.execute(
+        update(notification_counters)
+        .where(
+            notification_counters.user_id.in_(recipients),
+            or_(notification_counters.read_through_at.is_(None), notification_counters.read_through_at < created_at),
+        )
+        .values(unread_count=func.greatest(notification_counters.unread_count - 1, 0))
+    )
+
+
+def recount_counters(db: Session, user_ids):
+    db.execute(
+        update(notification_counters)
+        .where(notification_counters.user_id.in_(user_ids), users.id == notification_counters.user_id)
+        .values(unread_count=unread_count_query(notification_counters.user_id, users.role, notification_counters.read_through_at))
+        .execution_options(synchronize_session=False)
+    )
+
+
+# A batch's broadcasts become visible (or stop being visible) to a student the
+# moment their enrollment changes, which no bump or drop accounts for. Every
+# enrollment writer already reports the students it touched for the
+# membership cache, so their counters are recounted in the same transaction.
+@event.listens_for(Session, "before_commit")
+def _recount_enrollment_changes(session):
+    # ORM enrollment changes only report themselves once flushed, so only a
+    # session holding some is flushed here; anything else returns straight away
+    if any(isinstance(row, enrollments) for row in (*session.new, *session.dirty, *session.deleted)):
+        session.flush()
+    stale = session.info.get("stale_memberships")
+    if not stale:
+        return
+    recount_counters(session, sorted(stale))
@@ -0,0 +1,69 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import func
+
+
+def make_etag(*parts):
+    return 'W/"%s"' % hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+# count and newest updated_at over everything the listing could show: an
+# insert, update or delete anywhere in the filter changes one of them. Only
+# the ETag built from both is a validator for a collection; a delete leaves
+# max(updated_at) where it was, so it can't be sent as Last-Modified.
+def version_query(stmt, updated_at):
+    return stmt.with_only_columns(func.count(), func.max(updated_at)).order_by(None)
+
+
+def _utc(value: datetime):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(_utc(last_modified), usegmt=True)
+
+
+def is_fresh(request: Request, etag: str, last_modified: Optional[datetime] = None):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # weak comparison, W/ prefixes don't matter
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _utc(last_modified).replace(microsecond=0) <= _utc(since)
+
+    return False
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None):
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+# Returns a 304 to send instead of the body, or None after putting the
+# validators on the response that is about to be built.
+def not_modified(request: Request, response: Response, *parts, last_modified: Optional[datetime] = None):
+    etag = make_etag(*parts)
+    if is_fresh(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    set_validators(response, etag, last_modified)
+    return None
@@ -0,0 +1,66 @@
+import json
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.cache import RedisCache, TTLCache
+from app.core.config import settings
+from app.models.models import users, RoleEnum
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    firebase_uid: str
+    email: str
+    role: RoleEnum
+    is_active: bool
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            id=row.id,
+            firebase_uid=row.firebase_uid,
+            email=row.email,
+            role=RoleEnum(row.role),
+            is_active=bool(row.is_active),
+        )
+
+
+def identity_from_json(raw):
+    data = json.loads(raw)
+    data["role"] = RoleEnum(data["role"])
+    return CurrentUser(**data)
+
+
+if settings.REDIS_URL:
+    identity_cache = RedisCache(
+        settings.REDIS_URL,
+        ttl=settings.IDENTITY_CACHE_TTL,
+        prefix="identity:",
+        dumps=lambda identity: json.dumps(asdict(identity)),
+        loads=identity_from_json,
+    )
+else:
+    identity_cache = TTLCache(max_size=settings.IDENTITY_CACHE_SIZE, ttl=settings.IDENTITY_CACHE_TTL)
+
+
+def invalidate_identity(firebase_uid: str):
+    identity_cache.invalidate(firebase_uid)
+
+
+# Any ORM write to a users row (role change, deactivation, delete) drops the
+# cached identity once the transaction commits.
+@event.listens_for(users, "after_update")
+@event.listens_for(users, "after_delete")
+def _mark_identity_stale(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_identities", set()).add(target.firebase_uid)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_identities(session):
+    for firebase_uid in session.info.pop("stale_identities", ()):
+        invalidate_identity(firebase_uid)
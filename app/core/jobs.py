@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import background_jobs
+
+logger = logging.getLogger(__name__)
+
+
+# Jobs are rows in background_jobs, so every worker can report on them and a
+# restart does not lose them. A runner is registered per kind and called as
+# runner(db, job, **job.params); the job row is locked for the whole run and
+# its success commits in the same transaction as the runner's writes, so a
+# job that dies halfway is rolled back and simply runs again when resumed.
+class JobRegistry:
+    def __init__(self, max_workers: int = 2):
+        self._runners = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    # on_success(job) runs once the job has committed, for anything that must
+    # not be seen before its writes are, like pushes to clients
+    def runner(self, kind: str, on_success=None):
+        def register(fn):
+            self._runners[kind] = (fn, on_success)
+            return fn
+        return register
+
+    def submit(self, kind: str, params: dict, owner_id: int = None):
+        with SessionLocal(expire_on_commit=False) as db:
+            job = background_jobs(kind=kind, params=params, owner_id=owner_id, status="pending", progress={})
+            db.add(job)
+            db.commit()
+
+        self._executor.submit(self._run, job.id)
+        return job
+
+    # for work that keeps its own state, like batch deletions
+    def spawn(self, fn, *args):
+        self._executor.submit(self._spawned, fn, args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _spawned(self, fn, args):
+        try:
+            fn(*args)
+        except Exception:
+            logger.exception("Background task %s failed", fn.__name__)
+
+    # Whoever flips pending to running owns the job; the row lock taken next
+    # is what tells resume_jobs the owner is still alive.
+    def _claim(self, db, job_id: int):
+        table = background_jobs.__table__
+        claimed = db.execute(update(table).where(table.c.id == job_id, table.c.status == "pending").values(status="running", updated_at=func.now())).rowcount
+        db.commit()
+        return bool(claimed)
+
+    def _run(self, job_id: int):
+        with SessionLocal() as db:
+            if not self._claim(db, job_id):
+                return
+
+            job = db.scalars(select(background_jobs).where(background_jobs.id == job_id, background_jobs.status == "running").with_for_update()).first()
+            if job is None:
+                db.rollback()
+                return
+
+            try:
+                if job.kind not in self._runners:
+                    raise ValueError(f"No runner for job kind {job.kind!r}")
+                runner, on_success = self._runners[job.kind]
+                job.result = runner(db, job, **job.params)
+                job.status = "succeeded"
+                job.finished_at = datetime.now(timezone.utc)
+                db.commit()
+            except Exception as e:
+                logger.exception("Job %s (%s) failed", job_id, job.kind)
+                db.rollback()
+                job.status = "failed"
+                job.error = str(e)
+                job.finished_at = datetime.now(timezone.utc)
+                db.commit()
+                return
+
+            if on_success is not None:
+                on_success(job)
+
+    # Running jobs whose row nobody holds a lock on lost their worker, pending
+    # ones were never picked up; both go back to pending and are queued here.
+    def resume_stale(self):
+        table = background_jobs.__table__
+        stale = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_STALE_SECONDS)
+        with SessionLocal() as db:
+            orphaned = select(table.c.id).where(table.c.status.in_(["pending", "running"]), table.c.updated_at < stale).with_for_update(skip_locked=True)
+            job_ids = db.execute(
+                update(table)
+                .where(table.c.id.in_(orphaned))
+                .values(status="pending", updated_at=func.now())
+                .returning(table.c.id)
+            ).scalars().all()
+            db.commit()
+
+        for job_id in job_ids:
+            self._executor.submit(self._run, job_id)
+        return job_ids
+
+
+jobs = JobRegistry(max_workers=settings.JOB_WORKERS)
+
+
+async def run_job_resumer():
+    while True:
+        try:
+            await asyncio.to_thread(jobs.resume_stale)
+        except Exception:
+            logger.exception("Resuming background jobs failed")
+        await asyncio.sleep(settings.JOB_RESUME_INTERVAL)
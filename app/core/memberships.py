@@ -0,0 +1,71 @@
+import json
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from app.core.cache import RedisCache, TTLCache
+from app.core.config import settings
+from app.core.pubsub import MEMBERSHIPS_TOPIC, broker
+from app.models.models import enrollments
+
+
+if settings.REDIS_URL:
+    membership_cache = RedisCache(
+        settings.REDIS_URL,
+        ttl=settings.MEMBERSHIP_CACHE_TTL,
+        prefix="memberships:",
+        dumps=lambda batch_ids: json.dumps(sorted(batch_ids)),
+        loads=lambda raw: frozenset(json.loads(raw)),
+    )
+else:
+    membership_cache = TTLCache(max_size=settings.MEMBERSHIP_CACHE_SIZE, ttl=settings.MEMBERSHIP_CACHE_TTL)
+
+
+def active_batches_query(user_id: int):
+    return select(enrollments.batch_id).where(enrollments.student_id == user_id,enrollments.is_active == True,)
+
+
+def active_batches(db: Session, user_id: int):
+    batch_ids = membership_cache.get(user_id)
+    if batch_ids is None:
+        batch_ids = frozenset(db.scalars(active_batches_query(user_id)).all())
+        membership_cache.set(user_id, batch_ids)
+    return batch_ids
+
+
+async def async_active_batches(db, user_id: int):
+    batch_ids = membership_cache.get(user_id)
+    if batch_ids is None:
+        batch_ids = frozenset((await db.scalars(active_batches_query(user_id))).all())
+        membership_cache.set(user_id, batch_ids)
+    return batch_ids
+
+
+# One cache round trip and one message however many students changed, since
+# an import or bulk enroll commits thousands at a time. Open notification
+# streams listen on MEMBERSHIPS_TOPIC and pick their batch topics again when
+# their user is in the list.
+def invalidate_memberships(*user_ids: int):
+    if not user_ids:
+        return
+    membership_cache.invalidate_many(user_ids)
+    broker.publish(MEMBERSHIPS_TOPIC, {"event": "memberships", "data": {"user_ids": sorted(user_ids)}})
+
+
+# Enrollment writes through the ORM drop the student's cached memberships once
+# the transaction commits; set-based writes add the student ids to
+# session.info["stale_memberships"] themselves or call invalidate_memberships.
+@event.listens_for(enrollments, "after_insert")
+@event.listens_for(enrollments, "after_update")
+@event.listens_for(enrollments, "after_delete")
+def _mark_memberships_stale(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        # moving an enrollment to another student changes the old one's too
+        previous = inspect(target).attrs.student_id.history.deleted
+        session.info.setdefault("stale_memberships", set()).update([target.student_id, *previous])
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_memberships(session):
+    invalidate_memberships(*session.info.pop("stale_memberships", ()))
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBroker:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._topics = {}
+        self._listeners = defaultdict(list)
+        self._loop = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self._loop = None
+
+    # safe to call from sync handlers running in the threadpool
+    def publish(self, topic: str, message: dict):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._deliver, topic, message)
+
+    # callback(message) for every message on topic, run on the event loop;
+    # for in-process state that has to follow writes made by other workers
+    def listen(self, topic: str, callback):
+        self._listeners[topic].append(callback)
+
+    def _deliver(self, topic: str, message: dict):
+        for callback in self._listeners.get(topic, ()):
+            try:
+                callback(message)
+            except Exception:
+                logger.exception("Listener for %s failed", topic)
+        for queue in tuple(self._subscribers.get(topic, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                logger.warning("Dropping %s message for a slow subscriber", topic)
+
+    @asynccontextmanager
+    async def subscribe(self, topics):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._topics[queue] = set()
+        self.resubscribe(queue, topics)
+        try:
+            yield queue
+        finally:
+            self.resubscribe(queue, ())
+            del self._topics[queue]
+
+    # Moves a live subscription to a new set of topics. Topics it keeps are
+    # never dropped in between, so nothing published to them is missed.
+    def resubscribe(self, queue, topics):
+        topics = set(topics)
+        for topic in topics - self._topics[queue]:
+            self._subscribers[topic].add(queue)
+        for topic in self._topics[queue] - topics:
+            self._subscribers[topic].discard(queue)
+            if not self._subscribers[topic]:
+                del self._subscribers[topic]
+        self._topics[queue] = topics
+
+
+class RedisBroker(LocalBroker):
+    def __init__(self, url: str, prefix: str = "notify:", queue_size: int = 100):
+        import redis
+
+        super().__init__(queue_size)
+        self.url = url
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+        self._listener = None
+
+    async def start(self):
+        await super().start()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        await super().stop()
+
+    # every worker, including this one, receives the message back from Redis
+    def publish(self, topic: str, message: dict):
+        self.client.publish(self.prefix + topic, json.dumps(message, default=str))
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+
+        while True:
+            try:
+                client = aioredis.Redis.from_url(self.url)
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(self.prefix + "*")
+                    async for raw in pubsub.listen():
+                        if raw["type"] != "pmessage":
+                            continue
+                        topic = raw["channel"].decode()[len(self.prefix):]
+                        self._deliver(topic, json.loads(raw["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redis pub/sub listener failed, reconnecting")
+                await asyncio.sleep(1)
+
+
+# membership changes for every user, see invalidate_memberships
+MEMBERSHIPS_TOPIC = "memberships"
+
+
+def user_topic(user_id: int):
+    return f"user:{user_id}"
+
+
+def batch_topic(batch_id: int):
+    return f"batch:{batch_id}"
+
+
+def role_topic(role):
+    return f"role:{getattr(role, 'value', role)}"
+
+
+broker = RedisBroker(settings.REDIS_URL) if settings.REDIS_URL else LocalBroker()
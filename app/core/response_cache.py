@@ -0,0 +1,96 @@
+import itertools
+import threading
+import time
+import uuid
+
+from app.core.cache import TTLCache
+from app.core.pubsub import broker
+
+
+# Serialized responses grouped by scope. Invalidating a scope bumps its
+# generation, so old entries simply stop being addressable and age out of the
+# LRU instead of having to be found and deleted.
+#
+# get hands back a token with the generation it looked up under; set only
+# stores if the scope hasn't been invalidated since, so a response built from
+# rows read before a write can't land under the generation that write started.
+#
+# settle is how long after an invalidation nothing is stored for that scope,
+# so a response built from a lagging replica doesn't get cached as current.
+#
+# Entries live in each worker. With a topic, invalidations are also published
+# through the broker, so the other workers drop the scope as well once the
+# message reaches them (with Redis; the local broker only has this process).
+# Scopes have to survive a JSON round trip for that.
+class ResponseCache:
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0, settle: float = 0, topic: str = None):
+        self.entries = TTLCache(max_size=max_size, ttl=ttl)
+        self.settle = settle
+        self.topic = topic
+        self.origin = uuid.uuid4().hex
+        self.invalidations = 0
+        # scope -> (generation, invalidated at); generations come from one
+        # counter so a scope dropped by _prune never reuses an old number
+        self._invalidated = {}
+        self._counter = itertools.count(1)
+        self._pruned_at = time.monotonic()
+        self._lock = threading.Lock()
+        if topic:
+            broker.listen(topic, self._invalidated_elsewhere)
+
+    def _generation(self, scope):
+        return self._invalidated.get(scope, (0, None))[0]
+
+    def get(self, scope, *parts):
+        generation = self._generation(scope)
+        token = (generation, time.monotonic())
+        return self.entries.get((scope, generation) + tuple(parts)), token
+
+    def set(self, scope, parts, value, token):
+        generation, looked_up_at = token
+        now = time.monotonic()
+        # anything older than ttl may predate an invalidation _prune has forgotten
+        if now - looked_up_at >= self.entries.ttl:
+            return
+
+        with self._lock:
+            current, invalidated_at = self._invalidated.get(scope, (0, None))
+            if current != generation:
+                return
+            if invalidated_at is not None and now - invalidated_at < self.settle:
+                return
+        self.entries.set((scope, generation) + tuple(parts), value)
+
+    def invalidate(self, *scopes):
+        self._invalidate(scopes)
+        if self.topic:
+            broker.publish(self.topic, {"event": "invalidate", "data": {"origin": self.origin, "scopes": list(scopes)}})
+
+    def _invalidated_elsewhere(self, message):
+        # the publishing worker gets its own message back and has already
+        # invalidated; doing it again would restart the settle window
+        if message["data"]["origin"] != self.origin:
+            self._invalidate(message["data"]["scopes"])
+
+    def _invalidate(self, scopes):
+        now = time.monotonic()
+        with self._lock:
+            for scope in scopes:
+                self._invalidated[scope] = (next(self._counter), now)
+            self.invalidations += len(scopes)
+            self._prune(now)
+
+    # Once ttl + settle has passed every entry stored before an invalidation
+    # has expired, so the scope can fall back to generation 0. Runs at most
+    # once per ttl to keep invalidate cheap.
+    def _prune(self, now):
+        horizon = self.entries.ttl + self.settle
+        if now - self._pruned_at < self.entries.ttl:
+            return
+        self._pruned_at = now
+        for scope, (_, invalidated_at) in list(self._invalidated.items()):
+            if now - invalidated_at >= horizon:
+                del self._invalidated[scope]
+
+    def stats(self):
+        return {**self.entries.stats(), "invalidations": self.invalidations, "scopes": len(self._invalidated)}
@@ -0,0 +1,75 @@
+from functools import lru_cache
+from typing import Any, List, get_args
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+from pydantic_core import to_json, to_jsonable_python
+from sqlalchemy import func, literal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=to_jsonable_python, option=orjson.OPT_NON_STR_KEYS)
+    return to_json(content)
+
+
+# response is the one FastAPI injects into the handler; headers already set
+# on it (cursors, validators) carry over to the bytes we send instead.
+def json_response(body: bytes, response: Response = None, status_code: int = status.HTTP_200_OK):
+    headers = dict(response.headers) if response is not None else None
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+def accepts_none(field):
+    return field.annotation is Any or type(None) in get_args(field.annotation)
+
+
+# The columns of table named like the fields of model, so a plain
+# select(*model_columns(...)) returns rows already shaped like the response.
+#
+# dump_rows never validates, so a NULL has to be impossible wherever the field
+# can't be None: nullable columns fall back to the field's default, and one
+# without a default is refused unless the database fills it in itself
+# (server_default, e.g. created_at) or the caller overrides it.
+def model_columns(model, table, **overrides):
+    columns = []
+    for name, field in model.model_fields.items():
+        if name in overrides:
+            columns.append(overrides[name].label(name))
+            continue
+
+        column = table.c[name]
+        if column.nullable and not accepts_none(field):
+            if not field.is_required():
+                column = func.coalesce(column, literal(field.get_default(call_default_factory=True), column.type)).label(name)
+            elif column.server_default is None:
+                raise TypeError(f"{table.name}.{name} is nullable but {model.__name__}.{name} is not Optional")
+        columns.append(column)
+    return columns
+
+
+# Column tuples straight from SQL to JSON: no ORM objects, no validation.
+# Only for rows selected with model_columns, or selects written with the same
+# care: nothing here catches a NULL the schema doesn't allow.
+def dump_rows(rows) -> bytes:
+    return dumps([row._asdict() for row in rows])
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model):
+    return TypeAdapter(List[model])
+
+
+# ORM objects validated exactly once and dumped by pydantic-core.
+def dump_models(model, objects) -> bytes:
+    adapter = list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+
+
+def dump_model(model, obj) -> bytes:
+    return model.__pydantic_serializer__.to_json(model.model_validate(obj))
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+
+import firebase_admin
+import jwt
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HttpKeySource:
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self):
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as resp:
+            jwks = json.loads(resp.read())
+            match = re.search(r"max-age=(\d+)", resp.headers.get("Cache-Control", ""))
+
+        max_age = int(match.group(1)) if match else 3600
+        return jwks, max_age
+
+
+class FileKeySource:
+    def __init__(self, path: str, max_age: int = 3600):
+        self.path = path
+        self.max_age = max_age
+
+    def fetch(self):
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f), self.max_age
+
+
+class SigningKeyStore:
+    def __init__(self, source, refresh_margin: int = 300, retry_interval: int = 30):
+        self.source = source
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.project_id = None
+        self.expires_at = 0.0
+        self.fetched_at = 0.0
+        self.attempted_at = 0.0
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+        self._task = None
+
+    def refresh(self):
+        jwks, max_age = self.source.fetch()
+        keys = {k["kid"]: jwt.PyJWK(k).key for k in jwks.get("keys", [])}
+        if not keys:
+            raise ValueError("Signing key source returned no keys")
+
+        with self._lock:
+            self._keys = keys
+            self.fetched_at = time.time()
+            self.expires_at = self.fetched_at + max_age
+        logger.info("Loaded %d Firebase signing keys, valid for %ss", len(keys), max_age)
+
+    def get(self, kid: str):
+        key = self._keys.get(kid)
+        if key is not None:
+            # a stalled background refresh must not stall requests: keep
+            # serving the key we have and try again off the request path
+            if time.time() >= self.expires_at:
+                self.refresh_in_background()
+            return key
+
+        if self._keys:
+            # a kid we have not seen yet, usually a rotation the scheduled
+            # refresh has not picked up; fetched once per retry interval
+            self.refresh_in_background()
+            raise ValueError("Unknown signing key id")
+
+        # nothing has ever loaded (startup failed), so there is nothing stale
+        # to serve; async callers reach this through a threadpool
+        with self._fetch_lock:
+            if not self._keys and time.time() - self.attempted_at >= self.retry_interval:
+                self.attempted_at = time.time()
+                self.refresh()
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise ValueError("Unknown signing key id")
+        return key
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._refreshing or time.time() - self.attempted_at < self.retry_interval:
+                return
+            self._refreshing = True
+            self.attempted_at = time.time()
+        threading.Thread(target=self._refresh_quietly, daemon=True).start()
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Firebase signing key refresh failed")
+        finally:
+            self._refreshing = False
+
+    def resolve_project_id(self):
+        if not self.project_id:
+            self.project_id = settings.FIREBASE_PROJECT_ID or firebase_admin.get_app().project_id
+        return self.project_id
+
+    def verify_id_token(self, token: str):
+        project_id = self.resolve_project_id()
+        header = jwt.get_unverified_header(token)
+        key = self.get(header.get("kid"))
+
+        decoded = jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=project_id,
+            issuer=f"https://securetoken.google.com/{project_id}",
+            options={"require": ["exp", "iat", "sub"]},
+            leeway=settings.FIREBASE_CLOCK_SKEW,
+        )
+        if not decoded["sub"]:
+            raise ValueError("Firebase token has an empty subject")
+
+        decoded["uid"] = decoded["sub"]
+        return decoded
+
+    async def start(self):
+        self.resolve_project_id()
+        await asyncio.to_thread(self.refresh)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            delay = max(self.expires_at - time.time() - self.refresh_margin, 0)
+            await asyncio.sleep(delay)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception:
+                logger.exception("Firebase signing key refresh failed")
+                await asyncio.sleep(self.retry_interval)
+
+
+def build_key_source():
+    if settings.FIREBASE_JWKS_FILE:
+        return FileKeySource(settings.FIREBASE_JWKS_FILE)
+    return HttpKeySource(settings.FIREBASE_JWKS_URL)
+
+
+signing_keys = SigningKeyStore(build_key_source(), refresh_margin=settings.FIREBASE_KEY_REFRESH_MARGIN)
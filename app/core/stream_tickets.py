@@ -0,0 +1,29 @@
+import hashlib
+import secrets
+
+from app.core.cache import RedisCache, TTLCache
+from app.core.config import settings
+
+
+# EventSource cannot send an Authorization header, so a stream is opened with
+# a ticket instead of the ID token: random, good for STREAM_TICKET_TTL
+# seconds and a single connect, so the copy that ends up in access logs is
+# worthless. Tickets are stored by hash and map to the firebase uid.
+if settings.REDIS_URL:
+    stream_tickets = RedisCache(settings.REDIS_URL, ttl=settings.STREAM_TICKET_TTL, prefix="stream-ticket:")
+else:
+    stream_tickets = TTLCache(max_size=settings.STREAM_TICKET_CACHE_SIZE, ttl=settings.STREAM_TICKET_TTL)
+
+
+def ticket_key(ticket: str):
+    return hashlib.sha256(ticket.encode()).hexdigest()
+
+
+def issue_ticket(firebase_uid: str):
+    ticket = secrets.token_urlsafe(32)
+    stream_tickets.set(ticket_key(ticket), firebase_uid)
+    return ticket
+
+
+def redeem_ticket(ticket: str):
+    return stream_tickets.pop(ticket_key(ticket))
@@ -0,0 +1,22 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+
+# Multi-row INSERT ... ON CONFLICT DO NOTHING. SQLAlchemy packs the parameter
+# list into VALUES pages of a few hundred rows per statement; RETURNING the
+# key columns tells the caller which rows went in and which already existed.
+def insert_ignore(db: Session, table, rows, key):
+    if not rows:
+        return set()
+
+    columns = [table.c[name] for name in key]
+    stmt = pg_insert(table).on_conflict_do_nothing().returning(*columns)
+    return {tuple(row) for row in db.execute(stmt, rows)}
+
+
+def existing(db: Session, column, values):
+    values = set(values)
+    if not values:
+        return set()
+    return set(db.scalars(select(column).where(column.in_(values))))
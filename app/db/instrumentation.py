@@ -0,0 +1,122 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.db.queries")
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.statements = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.statements[statement] += 1
+            if seconds > self.slowest:
+                self.slowest = seconds
+                self.slowest_statement = statement
+
+    def repeated(self, threshold: int = None):
+        threshold = threshold or settings.N_PLUS_ONE_THRESHOLD
+        return [(stmt, n) for stmt, n in self.statements.most_common() if n >= threshold]
+
+    def summary(self):
+        return {
+            "db_queries": self.count,
+            "db_time_ms": round(self.total * 1000, 2),
+            "db_slowest_ms": round(self.slowest * 1000, 2),
+            "db_slowest_statement": self.slowest_statement,
+            "db_repeated_statements": len(self.repeated()),
+        }
+
+
+_request_stats = contextvars.ContextVar("request_query_stats", default=None)
+_captures = []
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for capture in _captures:
+        capture.record(statement, elapsed)
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats.count)
+                headers["X-DB-Time-Ms"] = f"{stats.total * 1000:.2f}"
+                headers["X-DB-Slowest-Ms"] = f"{stats.slowest * 1000:.2f}"
+                headers["X-DB-Repeated-Statements"] = str(len(stats.repeated()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _request_stats.reset(token)
+            _log_request(scope, stats)
+
+
+def _log_request(scope, stats):
+    if not stats.count:
+        return
+
+    extra = {"method": scope["method"], "path": scope["path"], **stats.summary()}
+    repeated = stats.repeated()
+    if repeated:
+        statement, times = repeated[0]
+        logger.warning("Possible N+1 on %s %s: statement ran %d times: %s", scope["method"], scope["path"], times, statement, extra=extra)
+    else:
+        logger.info("%s %s ran %d queries in %.2fms", scope["method"], scope["path"], stats.count, stats.total * 1000, extra=extra)
+
+
+# test helper: with assert_max_queries(3): client.get("/students/")
+@contextmanager
+def assert_max_queries(limit: int):
+    stats = QueryStats()
+    _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        _captures.remove(stats)
+
+    if stats.count > limit:
+        statements = "\n".join(f"  {n}x {stmt}" for stmt, n in stats.statements.most_common())
+        raise AssertionError(f"Expected at most {limit} queries, got {stats.count}:\n{statements}")
@@ -0,0 +1,83 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    def __init__(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def encode_cursor(values) -> str:
+    payload = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+# types are the Python types of the key columns, so a cursor whose values
+# would not bind to them is a 400 here rather than a DataError in Postgres
+def decode_cursor(cursor: str, types):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        values = [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if len(values) != len(types) or not all(is_key_value(v, t) for v, t in zip(values, types)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def is_key_value(value, expected):
+    # bool is an int to isinstance, but never a valid id
+    return isinstance(value, expected) and not (isinstance(value, bool) and expected is not bool)
+
+
+def key_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return object
+
+
+def keyset(stmt, columns, page: PageParams, descending: bool = False):
+    if page.cursor:
+        values = tuple_(*decode_cursor(page.cursor, [key_type(c) for c in columns]))
+        key = tuple_(*columns)
+        stmt = stmt.where(key < values if descending else key > values)
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    # one extra row tells us whether another page exists
+    return stmt.order_by(None).order_by(*order).limit(page.limit + 1)
+
+
+def page_of(rows, page: PageParams, key):
+    rows = list(rows)
+    if len(rows) <= page.limit:
+        return rows, None
+
+    rows = rows[:page.limit]
+    return rows, encode_cursor(key(rows[-1]))
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+def created_key(row):
+    return (row.created_at, row.id)
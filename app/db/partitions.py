@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME = re.compile(r"_y(\d{4})m(\d{2})$")
+
+# arbitrary, just has to be the same in every worker
+MAINTENANCE_LOCK = 815015
+
+
+def month_start(d: date):
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int):
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date):
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def create_partition(conn, table: str, month: date):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+
+
+def ensure_partitions(conn, table: str, ahead: int, today: date = None):
+    current = month_start(today or datetime.now(timezone.utc).date())
+    for i in range(ahead + 1):
+        create_partition(conn, table, add_months(current, i))
+
+
+def list_partitions(conn, table: str):
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table ORDER BY c.relname"
+    ), {"table": table}).scalars()
+
+    partitions = []
+    for name in rows:
+        match = PARTITION_NAME.search(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return partitions
+
+
+# start of the oldest month that is kept; everything before it gets retired
+def retention_cutoff(keep_months: int, today: date = None):
+    return add_months(month_start(today or datetime.now(timezone.utc).date()), -keep_months)
+
+
+def expired_partitions(conn, table: str, keep_months: int, today: date = None):
+    cutoff = retention_cutoff(keep_months, today)
+    return [(name, month) for name, month in list_partitions(conn, table) if add_months(month, 1) <= cutoff]
+
+
+# Unread rows that are about to disappear still sit in the counters; take them
+# off in one statement per partition instead of recounting every user.
+def settle_unread_counters(conn, partition: str):
+    conn.execute(text(
+        "UPDATE notification_counters c SET unread_count = greatest(c.unread_count - s.n, 0) "
+        "FROM ("
+        f"  SELECT p.recipient_id, count(*) AS n FROM {partition} p "
+        "   JOIN notification_counters w ON w.user_id = p.recipient_id "
+        "   WHERE p.is_read IS NOT TRUE AND (w.read_through_at IS NULL OR p.created_at > w.read_through_at) "
+        "   GROUP BY p.recipient_id"
+        ") s WHERE c.user_id = s.recipient_id"
+    ))
+
+
+def retire_partition(conn, table: str, partition: str, archive_schema: str = None):
+    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition}"))
+    if archive_schema:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+        conn.execute(text(f"ALTER TABLE {partition} SET SCHEMA {archive_schema}"))
+    else:
+        conn.execute(text(f"DROP TABLE {partition}"))
+
+
+def maintain_notification_partitions(today: date = None):
+    if engine.dialect.name != "postgresql":
+        return None
+
+    with engine.begin() as conn:
+        # several workers run this loop; only one of them does the work
+        if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK}).scalar():
+            return None
+
+        ensure_partitions(conn, "notifications", settings.NOTIFICATION_PARTITIONS_AHEAD, today)
+
+        retired = []
+        for partition, _ in expired_partitions(conn, "notifications", settings.NOTIFICATION_RETENTION_MONTHS, today):
+            settle_unread_counters(conn, partition)
+            retire_partition(conn, "notifications", partition, settings.NOTIFICATION_ARCHIVE_SCHEMA)
+            retired.append(partition)
+
+    if retired:
+        logger.info("Retired notification partitions: %s", ", ".join(retired))
+    return {"retired": retired}
+
+
+async def run_partition_maintenance():
+    while True:
+        await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL)
+        try:
+            await asyncio.to_thread(maintain_notification_partitions)
+        except Exception:
+            logger.exception("Partition maintenance failed")
@@ -1,13 +1,112 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.cache import RedisCache, TTLCache
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
-engine = create_engine(settings.DATABASE_URL, echo=False)
+
+def pool_options():
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(settings.DATABASE_URL, echo=False, poolclass=InstrumentedQueuePool, **pool_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
+read_engine = None
+ReadSessionLocal = None
+
+if settings.READ_REPLICA_URL:
+    read_engine = create_engine(settings.READ_REPLICA_URL, echo=False, poolclass=InstrumentedQueuePool, **pool_options())
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# callers that wrote recently, keyed by their firebase uid so a refreshed
+# token stays sticky, keep reading from the primary until the replica has
+# caught up; in Redis when there is one, since their next read can land on
+# any worker
+if settings.REDIS_URL:
+    recent_writers = RedisCache(settings.REDIS_URL, ttl=settings.READ_REPLICA_STICKY_SECONDS, prefix="recent-writer:")
+else:
+    recent_writers = TTLCache(max_size=settings.READ_REPLICA_STICKY_SIZE, ttl=settings.READ_REPLICA_STICKY_SECONDS)
+
+
+def writer_key(request: Request):
+    # app.core.authen imports this module; verify_token is cached per token,
+    # so the handler's own auth does not verify a second time
+    from app.core.authen import request_uid
+    return request_uid(request)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_writer(session):
+    if not session.info.pop("wrote", False):
+        return
+    # get_current_user fills writer_key in; unauthenticated routes resolve it
+    # from the request only once they have actually written
+    key = session.info.get("writer_key")
+    if key is None and "request" in session.info:
+        key = session.info["writer_key"] = writer_key(session.info["request"])
+    if key:
+        recent_writers.set(key, True)
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["request"] = request
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request):
+    key = writer_key(request)
+    if ReadSessionLocal is None or (key and recent_writers.get(key)):
+        yield from get_db(request)
+        return
+
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def async_database_url():
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+# sqlalchemy.ext.asyncio needs greenlet and an async driver, so the async
+# stack is only loaded when it is switched on
+if settings.ASYNC_DB_ENABLED:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(async_database_url(), echo=False, poolclass=InstrumentedAsyncQueuePool, **pool_options())
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,37 @@
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.authen import get_current_user
+from app.core.identity import CurrentUser
+from app.core.memberships import active_batches
+from app.db.session import get_db
+from app.models.models import batch_deletions, batches, RoleEnum
+
+def require_batch_access(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    def check(batch_id):
+        if batch_id is None or current_user.role == RoleEnum.ADMIN:
+            return
+        if batch_id not in active_batches(db, current_user.id):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,detail="Not enrolled in this batch")
+    return check
+
+
+# A batch with an unfinished deletion takes no new dependents: anything added
+# behind the deletion job would block the final DELETE of the batch row.
+# Deleting a batch also deactivates it, so active batches skip the lookup.
+def batches_being_deleted(db: Session, batch_ids):
+    batch_ids = set(batch_ids)
+    if not batch_ids:
+        return set()
+    return set(db.scalars(
+        select(batch_deletions.batch_id).where(batch_deletions.batch_id.in_(batch_ids),batch_deletions.status != "succeeded",)
+    ))
+
+
+def get_writable_batch(db: Session, batch_id: int, not_found: str = "Batch not found"):
+    batch = db.query(batches).filter(batches.id == batch_id).first()
+    if not batch:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    if not batch.is_active and batches_being_deleted(db, [batch_id]):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Batch is being deleted")
+    return batch
@@ -1,15 +1,51 @@
+import asyncio
 from fastapi import FastAPI
-from app.db.session import engine
+from app.core.config import settings
+from app.db.session import engine, async_engine
 from app.db.base import Base
+from app.db.instrumentation import QueryStatsMiddleware
+from app.db.partitions import maintain_notification_partitions, run_partition_maintenance
 from app.config.firebase import init_firebase
-from app.routes import auth, batch, allotment, content, notification, comment, student, teacher, timetable 
+from app.core.jobs import jobs as job_registry, run_job_resumer
+from app.core.pubsub import broker
+from app.core.signing_keys import signing_keys
+from app.routes.batch import run_batch_deletion_resumer
+from app.routes import auth, batch, allotment, content, notification, comment, student, teacher, timetable, metrics, jobs, export, imports
 
 async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)    
+    # this month's notification partition has to exist before the first insert
+    maintain_notification_partitions()
     init_firebase()
+    await signing_keys.start()
+    await broker.start()
+    maintenance = asyncio.create_task(run_partition_maintenance())
+    # picks up deletions a previous process left half done
+    deletions = asyncio.create_task(run_batch_deletion_resumer())
+    # and jobs whose worker went away
+    resumer = asyncio.create_task(run_job_resumer())
     yield
+    resumer.cancel()
+    deletions.cancel()
+    maintenance.cancel()
+    await broker.stop()
+    await signing_keys.stop()
+    job_registry.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(QueryStatsMiddleware)
+
+# The async handlers are registered first so they shadow their sync
+# counterparts on the same paths; everything else stays on the sync stack.
+if settings.ASYNC_DB_ENABLED:
+    from app.routes.aio import auth as aio_auth, content as aio_content, notification as aio_notification, timetable as aio_timetable
+
+    app.include_router(aio_auth.router)
+    app.include_router(aio_content.router)
+    app.include_router(aio_notification.router)
+    app.include_router(aio_timetable.router)
 
 app.include_router(auth.router)
 app.include_router(batch.router)
@@ -20,6 +56,10 @@ app.include_router(comment.router)
 app.include_router(student.router)
 app.include_router(teacher.router)
 app.include_router(timetable.router)
+app.include_router(metrics.router)
+app.include_router(jobs.router)
+app.include_router(export.router)
+app.include_router(imports.router)
 
 
 @app.get("/")
@@ -1,7 +1,8 @@
 from enum import Enum
 from sqlalchemy.sql import func
 from app.db.base import Base
-from sqlalchemy import (Column,Integer,String,Boolean,DateTime,Float,ForeignKey,Text,Enum as SAEnum,UniqueConstraint,)
+from sqlalchemy import (Column,Integer,String,Boolean,Date,DateTime,Time,Float,ForeignKey,Text,JSON,Enum as SAEnum,UniqueConstraint,Index,CheckConstraint,DDL,event,literal_column,)
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 
 class RoleEnum(str, Enum):
     ADMIN = "ADMIN"
@@ -28,6 +29,11 @@ class AuthProviderEnum(str, Enum):
     google = "google"          
 
 
+class AudienceEnum(str, Enum):
+    batch = "batch"
+    role = "role"
+
+
 class users(Base):
     __tablename__ = "users"
 
@@ -64,16 +70,21 @@ class batches(Base):
     end_date = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
 class enrollments(Base):
     __tablename__ = "enrollments"
 
     id = Column(Integer, primary_key=True, index=True)
-    batch_id = Column(Integer, ForeignKey("batches.id"), nullable=False, index=True)
-    student_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    batch_id = Column(Integer, ForeignKey("batches.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     joined_at = Column(DateTime(timezone=True), server_default=func.now())
     is_active = Column(Boolean, default=True)
     role_in_batch = Column(String, default="student")
+    __table_args__ = (
+        Index("uq_enrollments_batch_student", "batch_id", "student_id", unique=True, postgresql_include=["is_active"]),
+        Index("ix_enrollments_student_active", "student_id", "is_active", "batch_id"),
+    )
 
 
 class contents(Base):
@@ -85,32 +96,79 @@ class contents(Base):
     content_type = Column(SAEnum(ContentTypeEnum),default=ContentTypeEnum.video,index=True,)
     storage_url = Column(String, nullable=False)
     uploader_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    batch_id = Column(Integer, ForeignKey("batches.id"), nullable=True, index=True)
+    batch_id = Column(Integer, ForeignKey("batches.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
     is_public = Column(Boolean, default=False)
+    __table_args__ = (Index("ix_contents_batch_created", "batch_id", "created_at", "id"),)
 
 
 class comments(Base):
     __tablename__ = "comments"
 
     id = Column(Integer, primary_key=True, index=True)
-    content_id = Column(Integer, ForeignKey("contents.id"), nullable=False, index=True)
+    content_id = Column(Integer, ForeignKey("contents.id"), nullable=False)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     text = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
     is_public = Column(Boolean, default=True)
+    __table_args__ = (Index("ix_comments_content_public_created", "content_id", "is_public", "created_at", "id"),)
 
 
+# Range partitioned by month on created_at (see app/db/partitions.py), so the
+# partition key has to be part of the primary key.
 class notifications(Base):
     __tablename__ = "notifications"
 
-    id = Column(Integer, primary_key=True, index=True)
-    recipient_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    recipient_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String, nullable=True)
     message = Column(Text, nullable=False)
     channel = Column(String, default="in-app")
     is_read = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
+    __table_args__ = (
+        Index("ix_notifications_recipient_created", "recipient_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+class broadcast_notifications(Base):
+    __tablename__ = "broadcast_notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    audience = Column(SAEnum(AudienceEnum), nullable=False)
+    batch_id = Column(Integer, ForeignKey("batches.id"), nullable=True)
+    role = Column(SAEnum(RoleEnum), nullable=True)
+    sender_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    title = Column(String, nullable=True)
+    message = Column(Text, nullable=False)
+    channel = Column(String, default="in-app")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    __table_args__ = (
+        Index("ix_broadcast_notifications_batch_created", "batch_id", "created_at"),
+        Index("ix_broadcast_notifications_role_created", "role", "created_at"),
+    )
+
+
+class broadcast_receipts(Base):
+    __tablename__ = "broadcast_receipts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    broadcast_id = Column(Integer, ForeignKey("broadcast_notifications.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    read_at = Column(DateTime(timezone=True), nullable=True)
+    dismissed_at = Column(DateTime(timezone=True), nullable=True)
+    __table_args__ = (UniqueConstraint("broadcast_id", "user_id", name="uq_broadcast_receipt_user"),)
+
+
+class notification_counters(Base):
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
+    read_through_at = Column(DateTime(timezone=True), nullable=True)
 
 
 class schedules(Base):
@@ -148,13 +206,25 @@ class teachers(Base):
     experience = Column(Integer, nullable=True)
     qualifications = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
 class batch_teachers(Base):
     __tablename__ = "batch_teachers"
 
     id = Column(Integer, primary_key=True, index=True)
     batch_id = Column(Integer, ForeignKey("batches.id"), nullable=False)
-    teacher_id = Column(Integer, ForeignKey("teachers.id"), nullable=False)
+    teacher_id = Column(Integer, ForeignKey("teachers.id"), nullable=False, index=True)
+    __table_args__ = (UniqueConstraint("batch_id", "teacher_id", name="uq_batch_teacher"),)
+
+
+# Postgres has no range type over time of day, so slots are compared as
+# timestamp ranges on a fixed date. Queries have to spell the range exactly
+# like this to be answered from the exclusion constraints' GiST indexes.
+SLOT_DATE = literal_column("DATE '2000-01-01'", Date)
+
+
+def slot_period(start_time, end_time):
+    return func.tsrange(SLOT_DATE + start_time, SLOT_DATE + end_time)
 
 
 class timetable_slots(Base):
@@ -162,10 +232,65 @@ class timetable_slots(Base):
 
     id = Column(Integer, primary_key=True, index=True)
 
-    teacher_id = Column(Integer, ForeignKey("teachers.id"), nullable=False, index=True)
-    class_id = Column(Integer, ForeignKey("batches.id"), nullable=False, index=True)
+    teacher_id = Column(Integer, ForeignKey("teachers.id"), nullable=False)
+    class_id = Column(Integer, ForeignKey("batches.id"), nullable=False)
     subject_id = Column(Integer, nullable=False) 
     day = Column(String, nullable=False)
-    start_time = Column(String, nullable=False)
-    end_time = Column(String, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    __table_args__ = (
+        CheckConstraint(end_time > start_time, name="ck_timetable_slots_time_order"),
+        # neither a teacher nor a class can be in two overlapping slots; checked
+        # at commit so a bulk edit can move slots past each other
+        ExcludeConstraint((teacher_id, "="), (day, "="), (slot_period(start_time, end_time), "&&"), name="ex_timetable_slots_teacher_overlap", using="gist", deferrable=True, initially="DEFERRED"),
+        ExcludeConstraint((class_id, "="), (day, "="), (slot_period(start_time, end_time), "&&"), name="ex_timetable_slots_class_overlap", using="gist", deferrable=True, initially="DEFERRED"),
+        Index("ix_timetable_slots_teacher_day_start", "teacher_id", "day", "start_time"),
+        Index("ix_timetable_slots_class_day_start", "class_id", "day", "start_time"),
+    )
+
+
+# the exclusion constraints need GiST support for the plain = columns
+event.listen(
+    timetable_slots.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+
+
+# Progress of a background batch deletion. step is the dependent table being
+# cleared right now, everything before it in the deletion order is gone;
+# updated_at doubles as the heartbeat other workers use to take over.
+class batch_deletions(Base):
+    __tablename__ = "batch_deletions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(Integer, nullable=False, index=True)
+    requested_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    status = Column(String, nullable=False, default="pending")
+    step = Column(String, nullable=True)
+    progress = Column(JSON, nullable=False, default=dict)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class background_jobs(Base):
+    __tablename__ = "background_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    params = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="pending")
+    progress = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    __table_args__ = (
+        Index("ix_background_jobs_status_updated", "status", "updated_at"),
+    )
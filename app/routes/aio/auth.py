@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Body
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.authen import async_verify_token
+from app.core.identity import invalidate_identity
+from app.db.session import get_async_db
+from app.routes.auth import (
+    security,
+    register_params,
+    upsert_user_stmt,
+    upsert_provider_stmt,
+    register_response,
+    login_params,
+    login_stmt,
+    login_response,
+)
+
+router = APIRouter(prefix="/auth", tags=["Auth"])
+
+
+@router.post("/register")
+async def register_user(data: dict = Body(...),credentials=Depends(security),db: AsyncSession = Depends(get_async_db)):
+    decoded = await async_verify_token(credentials.credentials)
+
+    firebase_uid, email, full_name, email_verified, provider_enum = register_params(data, decoded)
+
+    user = (await db.execute(upsert_user_stmt(firebase_uid, email, full_name, email_verified, provider_enum))).one()
+    await db.execute(upsert_provider_stmt(user.id, provider_enum, firebase_uid))
+    await db.commit()
+    invalidate_identity(firebase_uid)
+
+    return register_response(user, provider_enum)
+
+
+@router.post("/login")
+async def login_user(credentials=Depends(security),db: AsyncSession = Depends(get_async_db)):
+    try:
+        decoded = await async_verify_token(credentials.credentials)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="Invalid or expired Firebase token")
+
+    firebase_uid, email_verified, provider_enum = login_params(decoded)
+
+    user = (await db.execute(login_stmt(firebase_uid, email_verified, provider_enum))).first()
+    await db.commit()
+
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="User not registered. Please sign up first.")
+
+    invalidate_identity(firebase_uid)
+
+    return login_response(user)
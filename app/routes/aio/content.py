@@ -0,0 +1,51 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.pagination import PageParams, page_of, created_key
+from app.db.session import get_async_db
+from app.models.models import contents, RoleEnum
+from app.schema import ContentRead
+from app.core.authen import async_get_current_user
+from app.core.identity import CurrentUser
+from app.core.etag import is_fresh, not_modified, not_modified_response, version_query
+from app.core.memberships import async_active_batches
+from app.core.serialization import dump_model, json_response
+from app.routes.content import contents_filter, contents_query, contents_etag, content_list_cache, cached_contents_response, serialize_contents
+
+router = APIRouter(prefix="/contents", tags=["Contents"])
+
+
+@router.get("/", response_model=List[ContentRead])
+async def list_contents(request: Request,batch_id: Optional[int] = None,only_public: bool = False,page: PageParams = Depends(),db: AsyncSession = Depends(get_async_db)):
+    parts = (only_public, page.cursor, page.limit)
+    entry, token = content_list_cache.get(batch_id, *parts)
+    if entry is not None:
+        return cached_contents_response(request, entry, "hit")
+
+    version = (await db.execute(version_query(contents_filter(batch_id, only_public), contents.updated_at))).one()
+    etag = contents_etag(batch_id, parts, version)
+    if is_fresh(request, etag):
+        return not_modified_response(etag)
+
+    rows, next_cursor = page_of((await db.execute(contents_query(batch_id, only_public, page))).all(), page, created_key)
+    entry = (serialize_contents(rows), next_cursor, etag)
+    content_list_cache.set(batch_id, parts, entry, token)
+    return cached_contents_response(request, entry, "miss")
+
+
+@router.get("/{content_id}", response_model=ContentRead)
+async def get_content(content_id: int,request: Request,response: Response,db: AsyncSession = Depends(get_async_db),current_user: CurrentUser = Depends(async_get_current_user),):
+    content = await db.get(contents, content_id)
+    if not content:
+        raise HTTPException(status_code=404, detail="Content not found")
+
+    if content.batch_id is not None and current_user.role != RoleEnum.ADMIN:
+        if content.batch_id not in await async_active_batches(db, current_user.id):
+            raise HTTPException(status_code=403, detail="Not enrolled in this batch")
+
+    cached = not_modified(request, response, "content", content.id, content.updated_at, last_modified=content.updated_at)
+    if cached:
+        return cached
+
+    return json_response(dump_model(ContentRead, content), response)
@@ -0,0 +1,20 @@
+from typing import List
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.serialization import dump_rows, json_response
+from app.db.pagination import PageParams, page_of, set_next_cursor
+from app.db.session import get_async_db
+from app.schema import NotificationRead
+from app.core.authen import async_get_current_user
+from app.core.identity import CurrentUser
+from app.routes.notification import my_notifications_query, notification_key
+
+router = APIRouter(prefix="/notifications", tags=["Notifications"])
+
+
+@router.get("/me", response_model=List[NotificationRead])
+async def list_my_notifications(response: Response,page: PageParams = Depends(),db: AsyncSession = Depends(get_async_db),current_user: CurrentUser = Depends(async_get_current_user)):
+    rows, next_cursor = page_of((await db.execute(my_notifications_query(current_user, page))).all(), page, notification_key)
+    set_next_cursor(response, next_cursor)
+    return json_response(dump_rows(rows), response)
@@ -0,0 +1,48 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.etag import not_modified, version_query
+from app.core.serialization import dump_model, dump_models, json_response
+from app.db.session import get_async_db
+from app.models.models import timetable_slots, teachers
+from app.schema import SlotRead
+from app.core.authen import async_get_current_user
+from app.core.identity import CurrentUser
+from app.routes.timetable import teacher_slots_query
+
+router = APIRouter(prefix="/timetable", tags=["timetable"])
+
+
+@router.get("/teachers/me", response_model=List[SlotRead])
+async def get_my_slots(
+    request: Request,
+    response: Response,
+    day: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(async_get_current_user),
+):
+    tr = (await db.scalars(select(teachers).where(teachers.user_id == current_user.id))).first()
+    if not tr:
+        raise HTTPException(404, "Teacher not found")
+
+    count, updated = (await db.execute(version_query(teacher_slots_query(tr.id, day), timetable_slots.updated_at))).one()
+    cached = not_modified(request, response, "teacher_slots", tr.id, day, count, updated)
+    if cached:
+        return cached
+
+    rows = (await db.scalars(teacher_slots_query(tr.id, day))).all()
+    return json_response(dump_models(SlotRead, rows), response)
+
+
+@router.get("/{slot_id}", response_model=SlotRead)
+async def get_slot(slot_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    row = await db.get(timetable_slots, slot_id)
+    if not row:
+        raise HTTPException(404, "Slot not found")
+
+    cached = not_modified(request, response, "slot", row.id, row.updated_at, last_modified=row.updated_at)
+    if cached:
+        return cached
+    return json_response(dump_model(SlotRead, row), response)
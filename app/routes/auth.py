@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.security import HTTPBearer
+from sqlalchemy import and_, case, exists, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-from firebase_admin import auth as firebase_auth
+from app.core.authen import verify_token
+from app.core.identity import invalidate_identity
 from app.db.session import get_db
 from app.models.models import users, AuthProviderEnum, UserAuthProviders
 
@@ -10,13 +13,9 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
 security = HTTPBearer()
 
 def verify_firebase_token(token: str):
-    return firebase_auth.verify_id_token(token)
-
-@router.post("/register")
-def register_user(data: dict = Body(...),credentials=Depends(security),db: Session = Depends(get_db)):
-    token = credentials.credentials
-    decoded = verify_firebase_token(token)
+    return verify_token(token)
 
+def register_params(data: dict, decoded: dict):
     firebase_uid = decoded["uid"]
     email = decoded.get("email")
     email_verified = decoded.get("email_verified", False)
@@ -49,50 +48,42 @@ def register_user(data: dict = Body(...),credentials=Depends(security),db: Sessi
     else:
         full_name = decoded.get("name") or decoded.get("display_name")
 
-    user = db.query(users).filter(users.firebase_uid == firebase_uid).first()
-
-    if not user:
-        user = users(
-            firebase_uid=firebase_uid,
-            email=email,
-            full_name=full_name,
-            is_verified=email_verified,
-            auth_provider=provider_enum,
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    else:
-        updated = False
+    return firebase_uid, email, full_name, email_verified, provider_enum
 
-        if not user.full_name and full_name:
-            user.full_name = full_name
-            updated = True
 
-        if email_verified and not user.is_verified:
-            user.is_verified = True
-            updated = True
+def upsert_user_stmt(firebase_uid, email, full_name, email_verified, provider_enum):
+    stmt = insert(users).values(
+        firebase_uid=firebase_uid,
+        email=email,
+        full_name=full_name,
+        is_verified=email_verified,
+        auth_provider=provider_enum,
+    )
+    changed = or_(
+        and_(users.full_name.is_(None), stmt.excluded.full_name.isnot(None)),
+        and_(stmt.excluded.is_verified, users.is_verified.isnot(True)),
+        users.auth_provider.is_distinct_from(stmt.excluded.auth_provider),
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[users.firebase_uid],
+        set_={
+            "full_name": func.coalesce(users.full_name, stmt.excluded.full_name),
+            "is_verified": or_(users.is_verified.is_(True), stmt.excluded.is_verified),
+            "auth_provider": stmt.excluded.auth_provider,
+            "updated_at": case((changed, func.now()), else_=users.updated_at),
+        },
+    ).returning(users.id, users.email, users.full_name)
 
-        if user.auth_provider != provider_enum:
-            user.auth_provider = provider_enum
-            updated = True
 
-        if updated:
-            db.commit()
-            db.refresh(user)
+def upsert_provider_stmt(user_id, provider_enum, firebase_uid):
+    return (
+        insert(UserAuthProviders)
+        .values(user_id=user_id, provider=provider_enum, provider_uid=firebase_uid)
+        .on_conflict_do_nothing(constraint="uq_user_provider")
+    )
 
-    # ---- Ensure provider entry exists ----
-    provider_row = db.query(UserAuthProviders).filter(UserAuthProviders.user_id == user.id,UserAuthProviders.provider == provider_enum).first()
-    
-    if not provider_row:
-        provider_row = UserAuthProviders(
-            user_id=user.id,
-            provider=provider_enum,
-            provider_uid=firebase_uid,
-        )
-        db.add(provider_row)
-        db.commit()
 
+def register_response(user, provider_enum):
     return {
         "message": "User registered successfully",
         "user": {
@@ -104,15 +95,7 @@ def register_user(data: dict = Body(...),credentials=Depends(security),db: Sessi
     }
 
 
-@router.post("/login")
-def login_user(credentials=Depends(security),db: Session = Depends(get_db)):
-
-    token = credentials.credentials
-    try:
-        decoded = firebase_auth.verify_id_token(token)
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="Invalid or expired Firebase token")
-
+def login_params(decoded: dict):
     firebase_uid = decoded["uid"]
     email = decoded.get("email")
     email_verified = decoded.get("email_verified", False)
@@ -126,26 +109,33 @@ def login_user(credentials=Depends(security),db: Session = Depends(get_db)):
         if raw_provider == "google.com"
         else AuthProviderEnum.password
     )
+    return firebase_uid, email_verified, provider_enum
+
+
+def login_stmt(firebase_uid, email_verified, provider_enum):
+    changes = {"auth_provider": provider_enum}
+    conditions = [users.auth_provider.is_distinct_from(provider_enum)]
+    if email_verified:
+        changes["is_verified"] = True
+        conditions.append(users.is_verified.isnot(True))
+
+    columns = (users.id, users.email, users.full_name, users.role, users.auth_provider)
+
+    # update only when something changed, otherwise fall through to the
+    # current row, all in one round trip
+    updated = (
+        update(users)
+        .where(users.firebase_uid == firebase_uid, or_(*conditions))
+        .values(**changes)
+        .returning(*columns)
+        .cte("updated")
+    )
+    return select(updated).union_all(
+        select(*columns).where(users.firebase_uid == firebase_uid, ~exists(select(updated.c.id)))
+    )
 
-    user = db.query(users).filter(users.firebase_uid == firebase_uid).first()
-
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="User not registered. Please sign up first.")
-
-    updated = False
-
-    if email_verified and not user.is_verified:
-        user.is_verified = True
-        updated = True
-
-    if user.auth_provider != provider_enum:
-        user.auth_provider = provider_enum
-        updated = True
-
-    if updated:
-        db.commit()
-        db.refresh(user)
 
+def login_response(user):
     return {
         "message": "Login successful",
         "user": {
@@ -156,3 +146,42 @@ def login_user(credentials=Depends(security),db: Session = Depends(get_db)):
             "provider": user.auth_provider.value,
         }
     }
+
+
+@router.post("/register")
+def register_user(data: dict = Body(...),credentials=Depends(security),db: Session = Depends(get_db)):
+    token = credentials.credentials
+    decoded = verify_firebase_token(token)
+
+    firebase_uid, email, full_name, email_verified, provider_enum = register_params(data, decoded)
+
+    user = db.execute(upsert_user_stmt(firebase_uid, email, full_name, email_verified, provider_enum)).one()
+
+    # ---- Ensure provider entry exists ----
+    db.execute(upsert_provider_stmt(user.id, provider_enum, firebase_uid))
+    db.commit()
+    invalidate_identity(firebase_uid)
+
+    return register_response(user, provider_enum)
+
+
+@router.post("/login")
+def login_user(credentials=Depends(security),db: Session = Depends(get_db)):
+
+    token = credentials.credentials
+    try:
+        decoded = verify_token(token)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="Invalid or expired Firebase token")
+
+    firebase_uid, email_verified, provider_enum = login_params(decoded)
+
+    user = db.execute(login_stmt(firebase_uid, email_verified, provider_enum)).first()
+    db.commit()
+
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="User not registered. Please sign up first.")
+
+    invalidate_identity(firebase_uid)
+
+    return login_response(user)
@@ -1,12 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.models.models import batches as Batch, users, RoleEnum
-from app.schema.schema import BatchCreate, BatchRead, BatchUpdate
+from app.core.config import settings
+from app.core.etag import not_modified, version_query
+from app.core.jobs import jobs
+from app.core.serialization import dumps, json_response
+from app.db.bulk import existing, insert_ignore
+from app.db.pagination import PageParams, keyset, page_of, created_key
+from app.db.session import SessionLocal, get_db
+from app.models.models import batches as Batch, batch_deletions, batch_teachers, broadcast_notifications, comments, contents, enrollments, schedules, timetable_slots, users, RoleEnum
+from app.schema.schema import BatchCreate, BatchRead, BatchDeletionRead, BatchUpdate, BulkEnrollmentCreate, BulkEnrollmentRead
+from app.dependencies.access import get_writable_batch
 from app.dependencies.role import require_roles
+from app.routes.content import content_list_cache
+from app.routes.notification import remove_broadcast
 
 router = APIRouter(prefix="/batches", tags=["Batches"])
 
+logger = logging.getLogger(__name__)
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def create_batch(data: BatchCreate,db: Session = Depends(get_db),current_user: users = Depends(require_roles(RoleEnum.ADMIN))):
     batch = Batch(
@@ -29,20 +45,31 @@ def create_batch(data: BatchCreate,db: Session = Depends(get_db),current_user: u
 
 
 @router.get("/")
-def fetch_batches(db: Session = Depends(get_db),current_user: users = Depends(require_roles(RoleEnum.ADMIN))):
-    batches = db.query(Batch).all()
-    return {
+def fetch_batches(request: Request,response: Response,page: PageParams = Depends(),db: Session = Depends(get_db),current_user: users = Depends(require_roles(RoleEnum.ADMIN))):
+    count, updated = db.execute(version_query(select(Batch), Batch.updated_at)).one()
+    cached = not_modified(request, response, "batches", page.cursor, page.limit, count, updated)
+    if cached:
+        return cached
+
+    rows = db.execute(keyset(select(*Batch.__table__.c), [Batch.created_at, Batch.id], page)).all()
+    batches, next_cursor = page_of(rows, page, created_key)
+    return json_response(dumps({
         "message": "Batches fetched successfully",
-        "batches": batches,
-    }
+        "batches": [row._asdict() for row in batches],
+        "next_cursor": next_cursor,
+    }), response)
 
 
 @router.get("/{batch_id}")
-def fetch_batch_by_id(batch_id: int, db: Session = Depends(get_db)):
+def fetch_batch_by_id(batch_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     batch = db.query(Batch).filter(Batch.id == batch_id).first()
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
 
+    cached = not_modified(request, response, "batch", batch.id, batch.updated_at, last_modified=batch.updated_at)
+    if cached:
+        return cached
+
     return {
         "message": "Batch fetched successfully",
         "batch": batch,
@@ -82,16 +109,173 @@ def update_batch(
     }
 
 
-@router.delete("/{batch_id}")
+@router.delete("/{batch_id}", status_code=status.HTTP_202_ACCEPTED)
 def delete_batch(batch_id: int,db: Session = Depends(get_db),current_user: users = Depends(require_roles(RoleEnum.ADMIN))):
     batch = db.query(Batch).filter(Batch.id == batch_id).first()
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
 
-    db.delete(batch)
+    # asking again picks up where a failed deletion stopped
+    deletion = db.scalars(select(batch_deletions).where(batch_deletions.batch_id == batch_id,batch_deletions.status != "succeeded",)).first()
+    if deletion is None:
+        deletion = batch_deletions(batch_id=batch_id, requested_by=current_user.id, status="pending", step=DELETION_STEPS[0][0], progress={})
+        db.add(deletion)
+    elif deletion.status == "failed":
+        deletion.status = "pending"
+        deletion.error = None
+
+    batch.is_active = False
     db.commit()
+    db.refresh(deletion)
+
+    if deletion.status == "pending":
+        jobs.spawn(run_batch_deletion, deletion.id)
 
     return {
-        "message": "Batch deleted successfully",
-        "batch": batch,
+        "message": "Batch deletion started",
+        "deletion": BatchDeletionRead.model_validate(deletion),
     }
+
+
+@router.get("/deletions/{deletion_id}", response_model=BatchDeletionRead)
+def get_batch_deletion(deletion_id: int,db: Session = Depends(get_db),current_user: users = Depends(require_roles(RoleEnum.ADMIN))):
+    deletion = db.get(batch_deletions, deletion_id)
+    if not deletion:
+        raise HTTPException(status_code=404, detail="Deletion not found")
+    return deletion
+
+
+# Dependents first, the batch row last. Every step is cleared in chunks of
+# BATCH_DELETE_CHUNK_SIZE rows, one short transaction each, so no lock is
+# held for long and nothing is loaded into memory.
+DELETION_STEPS = [
+    ("comments", comments, lambda batch_id: comments.content_id.in_(select(contents.id).where(contents.batch_id == batch_id))),
+    ("contents", contents, lambda batch_id: contents.batch_id == batch_id),
+    ("broadcast_notifications", broadcast_notifications, lambda batch_id: broadcast_notifications.batch_id == batch_id),
+    ("enrollments", enrollments, lambda batch_id: enrollments.batch_id == batch_id),
+    ("schedules", schedules, lambda batch_id: schedules.batch_id == batch_id),
+    ("timetable_slots", timetable_slots, lambda batch_id: timetable_slots.class_id == batch_id),
+    ("batch_teachers", batch_teachers, lambda batch_id: batch_teachers.batch_id == batch_id),
+    ("batches", Batch, lambda batch_id: Batch.id == batch_id),
+]
+
+
+def delete_chunk(db: Session, model, condition):
+    # one broadcast at a time: its unread counters have to be settled while
+    # the enrollments that decide its recipients still exist
+    if model is broadcast_notifications:
+        row = db.scalars(select(broadcast_notifications).where(condition).limit(1)).first()
+        if row is None:
+            return 0
+        remove_broadcast(db, row)
+        return 1
+
+    table = model.__table__
+    chunk = select(table.c.id).where(condition).limit(settings.BATCH_DELETE_CHUNK_SIZE)
+    returning = table.c.student_id if model is enrollments else table.c.id
+    removed = db.execute(delete(table).where(table.c.id.in_(chunk)).returning(returning)).scalars().all()
+
+    if model is enrollments:
+        db.info.setdefault("stale_memberships", set()).update(removed)
+    return len(removed)
+
+
+def clear_step(db: Session, deletion, name, model, condition):
+    while removed := delete_chunk(db, model, condition(deletion.batch_id)):
+        deletion.progress = {**deletion.progress, name: deletion.progress.get(name, 0) + removed}
+        db.commit()
+
+
+# Whoever flips pending to running owns the deletion; every committed chunk
+# bumps updated_at, which is the heartbeat resume_batch_deletions checks.
+def claim_deletion(db: Session, deletion_id: int):
+    table = batch_deletions.__table__
+    claimed = db.execute(update(table).where(table.c.id == deletion_id, table.c.status == "pending").values(status="running", updated_at=func.now())).rowcount
+    db.commit()
+    return bool(claimed)
+
+
+def run_batch_deletion(deletion_id: int):
+    with SessionLocal() as db:
+        if not claim_deletion(db, deletion_id):
+            return None
+
+        deletion = db.get(batch_deletions, deletion_id)
+        names = [name for name, _, _ in DELETION_STEPS]
+        try:
+            for name, model, condition in DELETION_STEPS[names.index(deletion.step or names[0]):]:
+                deletion.step = name
+                if model is Batch:
+                    # a writer that checked the batch just before the deletion
+                    # started can still have added rows to a cleared step
+                    for step in DELETION_STEPS[:-1]:
+                        clear_step(db, deletion, *step)
+                clear_step(db, deletion, name, model, condition)
+
+            deletion.status = "succeeded"
+            deletion.finished_at = datetime.now(timezone.utc)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            deletion.status = "failed"
+            deletion.error = str(e)
+            db.commit()
+            raise
+
+        content_list_cache.invalidate(deletion.batch_id, None)
+        return deletion.progress
+
+
+# Deletions nobody has touched for BATCH_DELETE_STALE_SECONDS: never picked
+# up, or their worker died. Touching them first keeps other workers, and the
+# next round of this loop, from queueing them again straight away.
+def resume_batch_deletions():
+    table = batch_deletions.__table__
+    stale = datetime.now(timezone.utc) - timedelta(seconds=settings.BATCH_DELETE_STALE_SECONDS)
+    with SessionLocal() as db:
+        deletion_ids = db.execute(
+            update(table)
+            .where(table.c.status.in_(["pending", "running"]), table.c.updated_at < stale)
+            .values(status="pending", updated_at=func.now())
+            .returning(table.c.id)
+        ).scalars().all()
+        db.commit()
+
+    for deletion_id in deletion_ids:
+        jobs.spawn(run_batch_deletion, deletion_id)
+    return deletion_ids
+
+
+async def run_batch_deletion_resumer():
+    while True:
+        try:
+            await asyncio.to_thread(resume_batch_deletions)
+        except Exception:
+            logger.exception("Resuming batch deletions failed")
+        await asyncio.sleep(settings.BATCH_DELETE_RESUME_INTERVAL)
+
+
+# Start of term enrollment waves: one query for unknown users, one for who is
+# already in the batch, then a single multi-row insert for everybody else.
+@router.post("/{batch_id}/enrollments:bulk", response_model=BulkEnrollmentRead)
+def bulk_enroll(batch_id: int,payload: BulkEnrollmentCreate,db: Session = Depends(get_db),current_user: users = Depends(require_roles(RoleEnum.ADMIN))):
+    get_writable_batch(db, batch_id)
+
+    student_ids = list(dict.fromkeys(payload.student_ids))
+    found = existing(db, users.id, student_ids)
+    enrolled_before = set(db.scalars(select(enrollments.student_id).where(enrollments.batch_id == batch_id,enrollments.student_id.in_(found))))
+
+    new_ids = [i for i in student_ids if i in found and i not in enrolled_before]
+    rows = [{"batch_id": batch_id, "student_id": i, "role_in_batch": payload.role_in_batch or "student", "is_active": True} for i in new_ids]
+    # ON CONFLICT still matters: a concurrent call may have enrolled some of them
+    inserted = {student_id for _, student_id in insert_ignore(db, enrollments.__table__, rows, ["batch_id", "student_id"])}
+
+    db.info.setdefault("stale_memberships", set()).update(inserted)
+    db.commit()
+
+    return BulkEnrollmentRead(
+        batch_id=batch_id,
+        enrolled=[i for i in new_ids if i in inserted],
+        already_enrolled=[i for i in student_ids if i in found and i not in inserted],
+        not_found=[i for i in student_ids if i not in found],
+    )
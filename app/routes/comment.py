@@ -1,8 +1,13 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.core.etag import not_modified, version_query
+from app.core.serialization import dump_model, dump_rows, json_response, model_columns
+from app.db.pagination import PageParams, keyset, page_of, set_next_cursor, created_key
+
+from app.db.session import get_db, get_read_db
 from app.models.models import comments, contents
 from app.schema import CommentCreate, CommentRead
 from app.core.authen import get_current_user
@@ -26,15 +31,23 @@ def add_comment(payload: CommentCreate,db: Session = Depends(get_db),current_use
     db.add(row)
     db.commit()
     db.refresh(row)
-    return CommentRead.model_validate(row)
+    return json_response(dump_model(CommentRead, row))
 
 
 @router.get("/content/{content_id}", response_model=List[CommentRead])
-def get_comments_by_content(content_id: int,db: Session = Depends(get_db)):
+def get_comments_by_content(content_id: int,request: Request,response: Response,page: PageParams = Depends(),db: Session = Depends(get_read_db)):
     content = db.query(contents).filter(contents.id == content_id).first()
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
 
-    rows = db.query(comments).filter(comments.content_id == content_id,comments.is_public == True).order_by(comments.created_at).all()
+    stmt = select(*model_columns(CommentRead, comments.__table__)).where(comments.content_id == content_id,comments.is_public == True)
+
+    count, updated = db.execute(version_query(stmt, comments.updated_at)).one()
+    cached = not_modified(request, response, "comments", content_id, page.cursor, page.limit, count, updated)
+    if cached:
+        return cached
+
+    rows, next_cursor = page_of(db.execute(keyset(stmt, [comments.created_at, comments.id], page)).all(), page, created_key)
+    set_next_cursor(response, next_cursor)
 
-    return [CommentRead.model_validate(r) for r in rows]
+    return json_response(dump_rows(rows), response)
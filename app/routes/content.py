@@ -1,23 +1,81 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.core.config import settings
+from app.core.etag import is_fresh, make_etag, not_modified, not_modified_response, set_validators, version_query
+from app.core.response_cache import ResponseCache
+from app.core.serialization import dump_model, dump_rows, json_response, model_columns
+from app.db.pagination import PageParams, keyset, page_of, set_next_cursor, created_key
+from app.db.session import get_db, get_read_db
 from app.models.models import (
     contents,
     comments,
-    enrollments,
-    batches,
     users,
     RoleEnum,
     ContentTypeEnum,
 )
 from app.schema import ContentRead, CommentCreate, CommentRead
+from app.dependencies.access import get_writable_batch, require_batch_access
 from app.dependencies.role import require_roles
 from app.core.authen import get_current_user
 
 router = APIRouter(prefix="/contents", tags=["Contents"])
 
+content_list_cache = ResponseCache(
+    max_size=settings.CONTENT_LIST_CACHE_SIZE,
+    ttl=settings.CONTENT_LIST_CACHE_TTL,
+    settle=settings.READ_REPLICA_STICKY_SECONDS if settings.READ_REPLICA_URL else 0,
+    topic="content-list-cache",
+)
+
+
+def contents_filter(batch_id: Optional[int], only_public: bool):
+    stmt = select(*model_columns(ContentRead, contents.__table__))
+
+    if batch_id is not None:
+        stmt = stmt.where(contents.batch_id == batch_id)
+
+    if only_public:
+        stmt = stmt.where(contents.is_public == True)
+
+    return stmt
+
+
+def contents_query(batch_id: Optional[int], only_public: bool, page: PageParams):
+    return keyset(contents_filter(batch_id, only_public), [contents.created_at, contents.id], page, descending=True)
+
+
+def serialize_contents(rows):
+    return dump_rows(rows)
+
+
+def contents_etag(batch_id: Optional[int], parts, version):
+    return make_etag("contents", batch_id, *parts, *version)
+
+
+def cached_contents_response(request: Request, entry, cache_status: str):
+    body, next_cursor, etag = entry
+    if is_fresh(request, etag):
+        response = not_modified_response(etag)
+    else:
+        response = Response(content=body, media_type="application/json")
+        set_validators(response, etag)
+        set_next_cursor(response, next_cursor)
+
+    response.headers["X-Cache"] = cache_status
+    return response
+
+
+def public_comments_filter(content_id: int):
+    return select(*model_columns(CommentRead, comments.__table__)).where(comments.content_id == content_id, comments.is_public == True)
+
+
+def public_comments_query(content_id: int, page: PageParams):
+    return keyset(public_comments_filter(content_id), [comments.created_at, comments.id], page)
+
+
 @router.post("/", response_model=ContentRead, status_code=status.HTTP_201_CREATED)
 def upload_content(
     title: str,
@@ -29,9 +87,7 @@ def upload_content(
     current_user: users = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.TEACHER)),
 ):
     if batch_id is not None:
-        batch = db.query(batches).filter(batches.id == batch_id).first()
-        if not batch:
-            raise HTTPException(status_code=404, detail="Batch not found")
+        get_writable_batch(db, batch_id)
 
     content = contents(
         title=title,
@@ -46,44 +102,60 @@ def upload_content(
     db.commit()
     db.refresh(content)
 
+    # the unfiltered listing includes every batch
+    content_list_cache.invalidate(batch_id, None)
+
     return content
 
 
 @router.get("/", response_model=List[ContentRead])
-def list_contents(batch_id: Optional[int] = None,only_public: bool = False,db: Session = Depends(get_db)):
-    q = db.query(contents)
-
-    if batch_id is not None:
-        q = q.filter(contents.batch_id == batch_id)
+def list_contents(request: Request,batch_id: Optional[int] = None,only_public: bool = False,page: PageParams = Depends(),db: Session = Depends(get_read_db)):
+    parts = (only_public, page.cursor, page.limit)
+    entry, token = content_list_cache.get(batch_id, *parts)
+    if entry is not None:
+        return cached_contents_response(request, entry, "hit")
 
-    if only_public:
-        q = q.filter(contents.is_public == True)
+    # a cheap aggregate answers a revalidation without running the listing
+    version = db.execute(version_query(contents_filter(batch_id, only_public), contents.updated_at)).one()
+    etag = contents_etag(batch_id, parts, version)
+    if is_fresh(request, etag):
+        return not_modified_response(etag)
 
-    return q.order_by(contents.created_at.desc()).all()
+    rows, next_cursor = page_of(db.execute(contents_query(batch_id, only_public, page)).all(), page, created_key)
+    entry = (serialize_contents(rows), next_cursor, etag)
+    content_list_cache.set(batch_id, parts, entry, token)
+    return cached_contents_response(request, entry, "miss")
 
 
 @router.get("/{content_id}", response_model=ContentRead)
-def get_content(content_id: int,db: Session = Depends(get_db),current_user: users = Depends(get_current_user),):
+def get_content(content_id: int,request: Request,response: Response,db: Session = Depends(get_db),check_batch_access = Depends(require_batch_access),):
     content = db.query(contents).filter(contents.id == content_id).first()
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
 
-    if content.batch_id is not None:
-        enrolled = db.query(enrollments).filter(enrollments.batch_id == content.batch_id,enrollments.student_id == current_user.id,enrollments.is_active == True,).first()
+    check_batch_access(content.batch_id)
 
-        if not enrolled and current_user.role != RoleEnum.ADMIN:
-            raise HTTPException(status_code=403, detail="Not enrolled in this batch")
+    cached = not_modified(request, response, "content", content.id, content.updated_at, last_modified=content.updated_at)
+    if cached:
+        return cached
 
-    return content
+    return json_response(dump_model(ContentRead, content), response)
 
 
 @router.get("/{content_id}/comments", response_model=List[CommentRead])
-def list_comments(content_id: int, db: Session = Depends(get_db)):
+def list_comments(content_id: int, request: Request, response: Response, page: PageParams = Depends(), db: Session = Depends(get_read_db)):
     content = db.query(contents).filter(contents.id == content_id).first()
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
 
-    return   db.query(comments).filter(comments.content_id == content_id, comments.is_public == True).order_by(comments.created_at.asc()).all()
+    count, updated = db.execute(version_query(public_comments_filter(content_id), comments.updated_at)).one()
+    cached = not_modified(request, response, "comments", content_id, page.cursor, page.limit, count, updated)
+    if cached:
+        return cached
+
+    rows, next_cursor = page_of(db.execute(public_comments_query(content_id, page)).all(), page, created_key)
+    set_next_cursor(response, next_cursor)
+    return json_response(dump_rows(rows), response)
 
 
 
@@ -93,20 +165,13 @@ def create_comment(
     payload: CommentCreate,
     db: Session = Depends(get_db),
     current_user: users = Depends(get_current_user),
+    check_batch_access = Depends(require_batch_access),
 ):
     content = db.query(contents).filter(contents.id == content_id).first()
     if not content:
         raise HTTPException(status_code=404, detail="Content not found")
 
-    if content.batch_id is not None:
-        enrolled = db.query(enrollments).filter(
-            enrollments.batch_id == content.batch_id,
-            enrollments.student_id == current_user.id,
-            enrollments.is_active == True,
-        ).first()
-
-        if not enrolled and current_user.role != RoleEnum.ADMIN:
-            raise HTTPException(status_code=403, detail="Not enrolled in this batch")
+    check_batch_access(content.batch_id)
 
     comment = comments(
         content_id=content_id,
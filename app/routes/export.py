@@ -0,0 +1,141 @@
+import csv
+import io
+from datetime import date, datetime, timezone
+from enum import Enum
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.serialization import dumps
+from app.db.session import ReadSessionLocal, SessionLocal
+from app.dependencies.role import require_roles
+from app.models.models import batches, comments, contents, enrollments, users, RoleEnum
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def batches_export(batch_id: Optional[int]):
+    stmt = select(*batches.__table__.c)
+    if batch_id is not None:
+        stmt = stmt.where(batches.id == batch_id)
+    return stmt.order_by(batches.id)
+
+
+def enrollments_export(batch_id: Optional[int]):
+    stmt = select(
+        enrollments.id,
+        enrollments.batch_id,
+        enrollments.student_id,
+        users.email.label("student_email"),
+        enrollments.role_in_batch,
+        enrollments.is_active,
+        enrollments.joined_at,
+    ).join(users, users.id == enrollments.student_id)
+    if batch_id is not None:
+        stmt = stmt.where(enrollments.batch_id == batch_id)
+    return stmt.order_by(enrollments.id)
+
+
+def students_export(batch_id: Optional[int]):
+    stmt = select(
+        users.id,
+        users.email,
+        users.full_name,
+        users.is_active,
+        users.is_verified,
+        users.created_at,
+    ).where(users.role == RoleEnum.STUDENT)
+    if batch_id is not None:
+        stmt = stmt.where(users.id.in_(select(enrollments.student_id).where(enrollments.batch_id == batch_id)))
+    return stmt.order_by(users.id)
+
+
+def contents_export(batch_id: Optional[int]):
+    stmt = select(*contents.__table__.c)
+    if batch_id is not None:
+        stmt = stmt.where(contents.batch_id == batch_id)
+    return stmt.order_by(contents.id)
+
+
+def comments_export(batch_id: Optional[int]):
+    stmt = select(*comments.__table__.c)
+    if batch_id is not None:
+        stmt = stmt.where(comments.content_id.in_(select(contents.id).where(contents.batch_id == batch_id)))
+    return stmt.order_by(comments.id)
+
+
+EXPORTS = {
+    "batches": batches_export,
+    "enrollments": enrollments_export,
+    "students": students_export,
+    "contents": contents_export,
+    "comments": comments_export,
+}
+
+
+def csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def ndjson_chunks(result):
+    for rows in result.partitions():
+        yield b"".join(dumps(row._asdict()) + b"\n" for row in rows)
+
+
+def csv_chunks(result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        chunk = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writerow(result.keys())
+    yield flush()
+    for rows in result.partitions():
+        writer.writerows([csv_value(v) for v in row] for row in rows)
+        yield flush()
+
+
+# The request's own session is closed by the time the body is sent, so the
+# generator opens its own, on the replica when there is one. yield_per makes
+# the driver use a server side cursor: only one chunk of rows is ever held
+# in memory and the first chunk goes out as soon as Postgres returns it.
+def stream_export(stmt, fmt: str):
+    session_factory = ReadSessionLocal or SessionLocal
+    with session_factory() as db:
+        result = db.execute(stmt.execution_options(yield_per=settings.EXPORT_CHUNK_SIZE))
+        chunks = ndjson_chunks(result) if fmt == "ndjson" else csv_chunks(result)
+        yield from chunks
+
+
+@router.get("/{dataset}")
+def export_dataset(
+    dataset: str,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    batch_id: Optional[int] = None,
+    current_user: users = Depends(require_roles(RoleEnum.ADMIN)),
+):
+    build = EXPORTS.get(dataset)
+    if build is None:
+        raise HTTPException(status_code=404, detail="Unknown export")
+
+    filename = f"{dataset}-{datetime.now(timezone.utc):%Y%m%d}.{format}"
+    return StreamingResponse(
+        stream_export(build(batch_id), format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,237 @@
+import csv
+import io
+import tempfile
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.bulk import existing, insert_ignore
+from app.db.session import get_db
+from app.dependencies.access import batches_being_deleted
+from app.dependencies.role import require_roles
+from app.models.models import batches, enrollments, teachers, users, RoleEnum
+from app.schema import ImportReport, ImportRowError
+
+router = APIRouter(prefix="/imports", tags=["Imports"])
+
+
+class RowError(ValueError):
+    pass
+
+
+def text_field(row, name, required=True):
+    value = (row.get(name) or "").strip()
+    if required and not value:
+        raise RowError(f"{name} is required")
+    return value or None
+
+
+def int_field(row, name, required=True):
+    value = text_field(row, name, required)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f"{name} must be an integer")
+
+
+class Importer:
+    def __init__(self, db: Session):
+        self.db = db
+        self.report = ImportReport()
+
+    def note(self, line, error):
+        if len(self.report.errors) < settings.IMPORT_MAX_ERRORS:
+            self.report.errors.append(ImportRowError(line=line, error=error))
+
+    def fail(self, line, error):
+        self.report.failed += 1
+        self.note(line, error)
+
+    def parse(self, chunk, parse_row):
+        parsed = []
+        for line, row in chunk:
+            try:
+                parsed.append((line, parse_row(row)))
+            except RowError as e:
+                self.fail(line, str(e))
+        return parsed
+
+    # One lookup for every email in the chunk instead of one per row; rows
+    # that give a user_id are checked the same way.
+    def resolve_users(self, parsed, field):
+        emails = {values["email"] for _, values in parsed if "email" in values}
+        by_email = dict(self.db.execute(select(users.email, users.id).where(users.email.in_(emails))).all()) if emails else {}
+        known = existing(self.db, users.id, (values[field] for _, values in parsed if field in values))
+
+        resolved = []
+        for line, values in parsed:
+            if "email" in values:
+                user_id = by_email.get(values.pop("email"))
+            else:
+                user_id = values[field] if values[field] in known else None
+
+            if user_id is None:
+                self.fail(line, "User not found")
+                continue
+            values[field] = user_id
+            resolved.append((line, values))
+        return resolved
+
+    def insert(self, table, parsed, key, message):
+        inserted = insert_ignore(self.db, table, [values for _, values in parsed], key)
+        seen = set()
+        for line, values in parsed:
+            k = tuple(values[name] for name in key)
+            if k in inserted and k not in seen:
+                self.report.inserted += 1
+                seen.add(k)
+            else:
+                self.report.skipped += 1
+                self.note(line, message)
+        return seen
+
+
+def user_reference(row):
+    email = text_field(row, "email", required=False)
+    if email:
+        return {"email": email}
+    return {}
+
+
+def parse_student(row):
+    return {
+        "firebase_uid": text_field(row, "firebase_uid"),
+        "email": text_field(row, "email"),
+        "full_name": text_field(row, "full_name", required=False),
+        "role": RoleEnum.STUDENT,
+        "is_active": True,
+        "is_verified": False,
+    }
+
+
+def parse_enrollment(row):
+    values = user_reference(row) or {"student_id": int_field(row, "user_id")}
+    values.update(
+        batch_id=int_field(row, "batch_id"),
+        role_in_batch=text_field(row, "role_in_batch", required=False) or "student",
+        is_active=True,
+    )
+    return values
+
+
+def parse_teacher(row):
+    values = user_reference(row) or {"user_id": int_field(row, "user_id")}
+    subjects = text_field(row, "subjects", required=False)
+    values.update(
+        subjects=",".join(s.strip() for s in subjects.split(",") if s.strip()) if subjects else None,
+        experience=int_field(row, "experience", required=False),
+        qualifications=text_field(row, "qualifications", required=False),
+    )
+    return values
+
+
+def import_students(importer: Importer, chunk):
+    parsed = importer.parse(chunk, parse_student)
+    importer.insert(users.__table__, parsed, ["firebase_uid"], "User already exists")
+
+
+def import_enrollments(importer: Importer, chunk):
+    parsed = importer.resolve_users(importer.parse(chunk, parse_enrollment), "student_id")
+
+    known = existing(importer.db, batches.id, (values["batch_id"] for _, values in parsed))
+    deleting = batches_being_deleted(importer.db, known)
+    valid = []
+    for line, values in parsed:
+        if values["batch_id"] not in known:
+            importer.fail(line, "Batch not found")
+        elif values["batch_id"] in deleting:
+            importer.fail(line, "Batch is being deleted")
+        else:
+            valid.append((line, values))
+
+    inserted = importer.insert(enrollments.__table__, valid, ["batch_id", "student_id"], "User already enrolled in this batch")
+    # nothing goes through the ORM, so the enrollment events never fire
+    importer.db.info.setdefault("stale_memberships", set()).update(student_id for _, student_id in inserted)
+
+
+def import_teachers(importer: Importer, chunk):
+    parsed = importer.resolve_users(importer.parse(chunk, parse_teacher), "user_id")
+    importer.insert(teachers.__table__, parsed, ["user_id"], "Teacher profile already exists")
+
+
+IMPORTS = {
+    "students": (import_students, {"firebase_uid", "email"}),
+    "enrollments": (import_enrollments, {"batch_id"}),
+    "teachers": (import_teachers, set()),
+}
+
+USER_REFERENCE = {"enrollments", "teachers"}
+
+
+def csv_rows(file, size):
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    yield reader.fieldnames or []
+
+    chunk = []
+    for row in reader:
+        chunk.append((reader.line_num, row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_import(db: Session, dataset: str, file):
+    handler, required = IMPORTS[dataset]
+    rows = csv_rows(file, settings.IMPORT_CHUNK_SIZE)
+
+    header = set(next(rows))
+    missing = required - header
+    if dataset in USER_REFERENCE and not header & {"user_id", "email"}:
+        missing.add("user_id or email")
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(sorted(missing))}")
+
+    importer = Importer(db)
+    # one transaction per chunk: a bad chunk never loses the ones before it
+    for chunk in rows:
+        handler(importer, chunk)
+        db.commit()
+
+    importer.report.errors.sort(key=lambda e: e.line)
+    return importer.report
+
+
+async def spool_body(request: Request):
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.IMPORT_SPOOL_BYTES)
+    async for data in request.stream():
+        spool.write(data)
+    spool.seek(0)
+    return spool
+
+
+# The body is the CSV itself (Content-Type: text/csv), spooled to disk past
+# IMPORT_SPOOL_BYTES and then read IMPORT_CHUNK_SIZE rows at a time.
+@router.post("/{dataset}", response_model=ImportReport)
+async def import_dataset(
+    dataset: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: users = Depends(require_roles(RoleEnum.ADMIN)),
+):
+    if dataset not in IMPORTS:
+        raise HTTPException(status_code=404, detail="Unknown import")
+
+    spool = await spool_body(request)
+    try:
+        return await run_in_threadpool(run_import, db, dataset, spool)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8")
+    finally:
+        spool.close()
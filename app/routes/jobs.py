@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.core.identity import CurrentUser
+from app.db.session import get_db
+from app.models.models import background_jobs, RoleEnum
+from app.schema import JobRead
+from app.dependencies.role import require_roles
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=JobRead)
+def get_job(job_id: int, db: Session = Depends(get_db), current_user: CurrentUser = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.COORDINATOR, RoleEnum.TEACHER))):
+    job = db.get(background_jobs, job_id)
+    if not job or (current_user.role != RoleEnum.ADMIN and job.owner_id != current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+from app.core.authen import token_cache
+from app.core.identity import identity_cache
+from app.core.memberships import membership_cache
+from app.db.pool import pool_status
+from app.db.session import engine, async_engine, read_engine
+from app.models.models import users, RoleEnum
+from app.routes.content import content_list_cache
+from app.dependencies.role import require_roles
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/")
+def get_metrics(current_user: users = Depends(require_roles(RoleEnum.ADMIN))):
+    return {
+        "token_cache": token_cache.stats(),
+        "identity_cache": identity_cache.stats(),
+        "membership_cache": membership_cache.stats(),
+        "content_list_cache": content_list_cache.stats(),
+        "db_pool": pool_status(engine.pool),
+        "read_db_pool": pool_status(read_engine.pool) if read_engine is not None else None,
+        "async_db_pool": pool_status(async_engine.sync_engine.pool) if async_engine is not None else None,
+    }
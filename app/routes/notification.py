@@ -1,27 +1,118 @@
-from typing import List
+import asyncio
+import json
+from typing import List, Optional, Union
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import String, Text, delete, false, func, insert, literal, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
-from app.models.models import notifications, users, enrollments, batches, users, RoleEnum
-from app.schema import NotificationCreate, NotificationRead
-from app.core.authen import get_current_user
+from app.core.config import settings
+from app.core.counters import below_watermark, bump_unread, drop_unread, read_through, recent_notifications, recount_unread, visible_broadcasts, with_receipt
+from app.core.identity import CurrentUser
+from app.core.jobs import jobs
+from app.core.memberships import active_batches
+from app.core.pubsub import MEMBERSHIPS_TOPIC, broker, user_topic, batch_topic, role_topic
+from app.core.stream_tickets import issue_ticket
+from app.core.serialization import dump_rows, json_response
+from app.db.pagination import PageParams, keyset, page_of, set_next_cursor
+from app.db.session import SessionLocal, get_db, get_read_db
+from app.models.models import notifications, users, enrollments, RoleEnum, AudienceEnum, broadcast_notifications, broadcast_receipts, notification_counters
+from app.schema import NotificationCreate, NotificationRead, BroadcastRead, StreamTicket, UnreadCount
+from app.core.authen import get_current_user, get_stream_user
+from app.dependencies.access import get_writable_batch
 from app.dependencies.role import require_roles
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
-@router.post("/",response_model=List[NotificationRead],status_code=status.HTTP_201_CREATED)
+
+def my_notifications_query(user, page: PageParams):
+    direct = select(
+        notifications.id,
+        literal("direct").label("kind"),
+        notifications.recipient_id,
+        notifications.title,
+        notifications.message,
+        notifications.channel,
+        or_(notifications.is_read == True, below_watermark(read_through(user.id), notifications.created_at)).label("is_read"),
+        notifications.created_at,
+    ).where(notifications.recipient_id == user.id, recent_notifications())
+
+    broadcasts = (
+        select(
+            broadcast_notifications.id,
+            literal("broadcast").label("kind"),
+            literal(user.id).label("recipient_id"),
+            broadcast_notifications.title,
+            broadcast_notifications.message,
+            broadcast_notifications.channel,
+            or_(broadcast_receipts.read_at.isnot(None), below_watermark(read_through(user.id), broadcast_notifications.created_at)).label("is_read"),
+            broadcast_notifications.created_at,
+        )
+        .outerjoin(broadcast_receipts, with_receipt(user.id))
+        .where(visible_broadcasts(user.id, user.role), broadcast_receipts.dismissed_at.is_(None))
+    )
+
+    merged = union_all(direct, broadcasts).subquery("merged")
+    return keyset(select(merged), [merged.c.created_at, merged.c.kind, merged.c.id], page, descending=True)
+
+
+def notification_key(row):
+    return (row.created_at, row.kind, row.id)
+
+
+def batch_recipients(batch_id: int):
+    return select(enrollments.student_id).where(enrollments.batch_id == batch_id,enrollments.is_active == True,)
+
+
+def broadcast_recipients(row):
+    if row.audience == AudienceEnum.batch:
+        return batch_recipients(row.batch_id)
+    return select(users.id).where(users.role == row.role)
+
+
+def create_broadcast(db: Session, current_user, payload: NotificationCreate, audience: AudienceEnum):
+    row = broadcast_notifications(
+        audience=audience,
+        batch_id=payload.batch_id if audience == AudienceEnum.batch else None,
+        role=payload.role if audience == AudienceEnum.role else None,
+        sender_id=current_user.id,
+        title=payload.title,
+        message=payload.message,
+        channel=payload.channel or "in-app",
+    )
+
+    db.add(row)
+    db.flush()
+    bump_unread(db, broadcast_recipients(row))
+    db.commit()
+    db.refresh(row)
+
+    broadcast = BroadcastRead.model_validate(row)
+    topic = batch_topic(row.batch_id) if audience == AudienceEnum.batch else role_topic(row.role)
+    push(topic, "broadcast", broadcast)
+    return broadcast
+
+
+def push(topic: str, event: str, data):
+    if isinstance(data, BaseModel):
+        data = data.model_dump(mode="json")
+    broker.publish(topic, {"event": event, "data": data})
+
+
+@router.post("/",response_model=Union[List[NotificationRead], BroadcastRead],status_code=status.HTTP_201_CREATED)
 def send_notification(
     payload: NotificationCreate,
+    count_only: bool = False,
     db: Session = Depends(get_db),
     current_user: users = Depends(require_roles(RoleEnum.ADMIN, RoleEnum.COORDINATOR, RoleEnum.TEACHER))):
 
-    if not payload.recipient_id and not payload.batch_id:
-        raise HTTPException(status_code=400,detail="recipient_id or batch_id is required",)
-
-    created_notifications = []
+    if not payload.recipient_id and not payload.batch_id and not payload.role:
+        raise HTTPException(status_code=400,detail="recipient_id, batch_id or role is required",)
 
     if payload.recipient_id:
         recipient = db.query(users).filter(users.id == payload.recipient_id).first()
@@ -38,43 +129,165 @@ def send_notification(
         )
 
         db.add(n)
+        bump_unread(db, [payload.recipient_id])
         db.commit()
         db.refresh(n)
 
+        push(user_topic(n.recipient_id), "notification", NotificationRead.model_validate(n))
         return [n]
 
+    if not payload.batch_id:
+        if current_user.role != RoleEnum.ADMIN:
+            raise HTTPException(status_code=403,detail="Only admins can send to a whole role",)
+
+        return create_broadcast(db, current_user, payload, AudienceEnum.role)
 
-    batch = db.query(batches).filter(batches.id == payload.batch_id).first()
-    if not batch:
-        raise HTTPException(status_code=404, detail="Batch not found")
+    batch = get_writable_batch(db, payload.batch_id)
 
     if (current_user.role == RoleEnum.COORDINATOR and batch.coordinator_id is not None and batch.coordinator_id != current_user.id):
         raise HTTPException(status_code=403,detail="Coordinator can send only to their own batch",)
 
-    enroll_rows = db.query(enrollments).filter(enrollments.batch_id == payload.batch_id,enrollments.is_active == True,).all()
+    # one broadcast row per batch; fanout=true keeps per-recipient rows
+    if not payload.fanout:
+        return create_broadcast(db, current_user, payload, AudienceEnum.batch)
 
-    for e in enroll_rows:
-        n = notifications(
-            recipient_id=e.student_id,
-            title=payload.title,
-            message=payload.message,
-            channel=payload.channel or "in-app",
-            is_read=False,
-            created_at=datetime.utcnow(),
-        )
-        db.add(n)
-        created_notifications.append(n)
+    if settings.NOTIFICATION_FANOUT_JOB_THRESHOLD:
+        recipients = db.scalar(select(func.count()).select_from(enrollments).where(enrollments.batch_id == payload.batch_id,enrollments.is_active == True,))
+
+        if recipients > settings.NOTIFICATION_FANOUT_JOB_THRESHOLD:
+            params = {"batch_id": payload.batch_id, "title": payload.title, "message": payload.message, "channel": payload.channel or "in-app"}
+            job = jobs.submit("notification_fanout", params, owner_id=current_user.id)
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"job_id": job.id, "status": job.status, "recipients": recipients})
+
+    stmt = batch_fanout_stmt(payload.batch_id, payload.title, payload.message, payload.channel or "in-app")
 
+    if count_only:
+        count = db.execute(stmt).rowcount
+        bump_unread(db, batch_recipients(payload.batch_id))
+        db.commit()
+        push(batch_topic(payload.batch_id), "sync", {"count": count})
+        return JSONResponse(status_code=status.HTTP_201_CREATED, content={"count": count})
+
+    created_notifications = db.execute(stmt.returning(*notifications.__table__.columns)).all()
+    bump_unread(db, batch_recipients(payload.batch_id))
     db.commit()
+
     for n in created_notifications:
-        db.refresh(n)
+        push(user_topic(n.recipient_id), "notification", NotificationRead.model_validate(n))
 
     return created_notifications
 
 
+def batch_fanout_stmt(batch_id: int, title, message: str, channel: str):
+    recipients = batch_recipients(batch_id).add_columns(
+        literal(title, String),
+        literal(message, Text),
+        literal(channel, String),
+        false(),
+        func.now(),
+    )
+
+    return insert(notifications).from_select(
+        ["recipient_id", "title", "message", "channel", "is_read", "created_at"],
+        recipients,
+    )
+
+
+# Runs in the job's own transaction, so the notifications and the job's
+# success commit together and a resumed job never inserts them twice.
+def batch_fanout_done(job):
+    push(batch_topic(job.params["batch_id"]), "sync", job.result)
+
+
+@jobs.runner("notification_fanout", on_success=batch_fanout_done)
+def run_batch_fanout(db: Session, job, batch_id: int, title, message: str, channel: str):
+    count = db.execute(batch_fanout_stmt(batch_id, title, message, channel)).rowcount
+    bump_unread(db, batch_recipients(batch_id))
+    return {"count": count}
+
+
+@router.post("/stream-ticket", response_model=StreamTicket)
+def create_stream_ticket(current_user: CurrentUser = Depends(get_current_user)):
+    return StreamTicket(ticket=issue_ticket(current_user.firebase_uid), expires_in=settings.STREAM_TICKET_TTL)
+
+
+# Batch topics follow the user's enrollments: invalidate_memberships sends a
+# "memberships" event naming the users whose enrollments changed, and their
+# streams pick them again.
+@router.get("/stream")
+async def stream_notifications(request: Request, current_user: CurrentUser = Depends(get_stream_user)):
+    async def stream_topics():
+        batch_ids = await run_in_threadpool(stream_batch_ids, current_user.id)
+        return [user_topic(current_user.id), role_topic(current_user.role), MEMBERSHIPS_TOPIC] + [batch_topic(b) for b in batch_ids]
+
+    topics = await stream_topics()
+
+    async def events():
+        async with broker.subscribe(topics) as queue:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=settings.NOTIFICATION_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message["event"] == "memberships":
+                    if current_user.id in message["data"]["user_ids"]:
+                        broker.resubscribe(queue, await stream_topics())
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def stream_batch_ids(user_id: int):
+    with SessionLocal() as db:
+        return active_batches(db, user_id)
+
+
+@router.get("/unread-count", response_model=UnreadCount)
+def get_unread_count(db: Session = Depends(get_db),current_user: users = Depends(get_current_user)):
+    counter = db.get(notification_counters, current_user.id)
+    if counter is None:
+        counter = recount_unread(db, current_user)
+        db.commit()
+
+    return UnreadCount(unread=counter.unread_count, read_through_at=counter.read_through_at)
+
+
+@router.put("/read-all", response_model=UnreadCount)
+def mark_all_read(
+    until: Optional[datetime] = None,
+    notification_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: users = Depends(get_current_user),
+):
+    if notification_id is not None:
+        until = db.scalar(select(notifications.created_at).where(notifications.id == notification_id,notifications.recipient_id == current_user.id,))
+        if until is None:
+            raise HTTPException(status_code=404, detail="Notification not found")
+
+    # the watermark never moves backwards and never past now
+    watermark = func.least(until, func.now()) if until else func.now()
+    stmt = pg_insert(notification_counters).values(user_id=current_user.id, read_through_at=watermark)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[notification_counters.user_id],
+        set_={"read_through_at": func.greatest(notification_counters.read_through_at, stmt.excluded.read_through_at)},
+    ))
+
+    counter = recount_unread(db, current_user)
+    db.commit()
+
+    result = UnreadCount(unread=counter.unread_count, read_through_at=counter.read_through_at)
+    push(user_topic(current_user.id), "read_all", result)
+    return result
+
+
 @router.get("/me", response_model=List[NotificationRead])
-def list_my_notifications(db: Session = Depends(get_db),current_user: users = Depends(get_current_user),limit: int = 100):
-    return (db.query(notifications).filter(notifications.recipient_id == current_user.id).order_by(notifications.created_at.desc()).limit(limit).all())
+def list_my_notifications(response: Response,page: PageParams = Depends(),db: Session = Depends(get_read_db),current_user: users = Depends(get_current_user)):
+    rows, next_cursor = page_of(db.execute(my_notifications_query(current_user, page)).all(), page, notification_key)
+    set_next_cursor(response, next_cursor)
+    return json_response(dump_rows(rows), response)
     
 
 @router.put("/{notification_id}/read", response_model=NotificationRead)
@@ -90,7 +303,10 @@ def mark_notification_read(
     if current_user.role != RoleEnum.ADMIN and n.recipient_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    n.is_read = True
+    # conditional update so concurrent marks only decrement the counter once
+    marked = db.execute(update(notifications).where(notifications.id == n.id,notifications.is_read.isnot(True),).values(is_read=True)).rowcount
+    if marked:
+        drop_unread(db, [n.recipient_id], n.created_at)
     db.commit()
     db.refresh(n)
 
@@ -106,5 +322,95 @@ def delete_notification(
     if not n:
         raise HTTPException(status_code=404, detail="Notification not found")
 
+    if not n.is_read:
+        drop_unread(db, [n.recipient_id], n.created_at)
     db.delete(n)
     db.commit()
+
+
+def addressed_to(db: Session, row, user):
+    if row.audience == AudienceEnum.role:
+        return row.role == user.role
+    return db.query(enrollments.id).filter(enrollments.batch_id == row.batch_id,enrollments.student_id == user.id,enrollments.is_active == True,).first() is not None
+
+
+def get_visible_broadcast(db: Session, broadcast_id: int, current_user):
+    row = db.query(broadcast_notifications).filter(broadcast_notifications.id == broadcast_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Notification not found")
+
+    if current_user.role != RoleEnum.ADMIN and not addressed_to(db, row, current_user):
+        raise HTTPException(status_code=404, detail="Notification not found")
+    return row
+
+
+def upsert_receipt(db: Session, broadcast, user, column: str):
+    user_id = user.id
+    other = "dismissed_at" if column == "read_at" else "read_at"
+
+    stmt = pg_insert(broadcast_receipts).values(broadcast_id=broadcast.id, user_id=user_id, **{column: func.now()})
+    changed = db.execute(stmt.on_conflict_do_update(
+        constraint="uq_broadcast_receipt_user",
+        set_={column: func.now()},
+        where=getattr(broadcast_receipts, column).is_(None),
+    ).returning(getattr(broadcast_receipts, other))).first()
+
+    # read and dismissed both take a broadcast out of the unread count, but
+    # only the first of the two should decrement it, and only if it was ever
+    # counted: admins can open broadcasts that were not addressed to them
+    if changed is not None and changed[0] is None:
+        if user.role != RoleEnum.ADMIN or addressed_to(db, broadcast, user):
+            drop_unread(db, [user_id], broadcast.created_at)
+    db.commit()
+
+
+@router.put("/broadcasts/{broadcast_id}/read", response_model=NotificationRead)
+def mark_broadcast_read(
+    broadcast_id: int,
+    db: Session = Depends(get_db),
+    current_user: users = Depends(get_current_user),
+):
+    row = get_visible_broadcast(db, broadcast_id, current_user)
+    upsert_receipt(db, row, current_user, "read_at")
+
+    return NotificationRead(
+        id=row.id,
+        kind="broadcast",
+        recipient_id=current_user.id,
+        title=row.title,
+        message=row.message,
+        channel=row.channel,
+        is_read=True,
+        created_at=row.created_at,
+    )
+
+
+@router.put("/broadcasts/{broadcast_id}/dismiss", status_code=status.HTTP_204_NO_CONTENT)
+def dismiss_broadcast(
+    broadcast_id: int,
+    db: Session = Depends(get_db),
+    current_user: users = Depends(get_current_user),
+):
+    row = get_visible_broadcast(db, broadcast_id, current_user)
+    upsert_receipt(db, row, current_user, "dismissed_at")
+
+
+@router.delete("/broadcasts/{broadcast_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_broadcast(
+    broadcast_id: int,
+    db: Session = Depends(get_db),
+    current_user: users = Depends(require_roles(RoleEnum.ADMIN))):
+    row = db.query(broadcast_notifications).filter(broadcast_notifications.id == broadcast_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Notification not found")
+
+    remove_broadcast(db, row)
+    db.commit()
+
+
+def remove_broadcast(db: Session, row):
+    handled = select(broadcast_receipts.user_id).where(broadcast_receipts.broadcast_id == row.id,or_(broadcast_receipts.read_at.isnot(None), broadcast_receipts.dismissed_at.isnot(None)),)
+    drop_unread(db, broadcast_recipients(row).except_(handled), row.created_at)
+
+    db.execute(delete(broadcast_receipts).where(broadcast_receipts.broadcast_id == row.id))
+    db.delete(row)
@@ -1,9 +1,13 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
-from app.models.models import users, enrollments, batches
+from app.db.pagination import PageParams, keyset, page_of, set_next_cursor, created_key
+from app.db.session import get_db, get_read_db
+from app.models.models import users, enrollments
+from app.dependencies.access import get_writable_batch
 from app.schema import EnrollmentCreate, EnrollmentUpdate, EnrollmentRead, StudentRead
 
 router = APIRouter(prefix="/students", tags=["students"])
@@ -15,16 +19,7 @@ def enroll_student(user_id: int, payload: EnrollmentCreate, db: Session = Depend
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    batch = db.query(batches).filter(batches.id == payload.batch_id).first()
-    if not batch:
-        raise HTTPException(status_code=404, detail="Batch not found")
-
-    existing = db.query(enrollments).filter(
-        enrollments.batch_id == payload.batch_id,
-        enrollments.student_id == user_id
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="User already enrolled in this batch")
+    get_writable_batch(db, payload.batch_id)
 
     enroll_row = enrollments(
         batch_id=payload.batch_id,
@@ -33,7 +28,11 @@ def enroll_student(user_id: int, payload: EnrollmentCreate, db: Session = Depend
     )
 
     db.add(enroll_row)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="User already enrolled in this batch")
     db.refresh(enroll_row)
 
     return enroll_row
@@ -66,31 +65,49 @@ def get_enrollment(enrollment_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=List[StudentRead])
-def list_students(db: Session = Depends(get_db)):
-
-    rows = db.query(enrollments).all()
-    student_ids = sorted({r.student_id for r in rows})
-
-    result: List[StudentRead] = []
-
-    for sid in student_ids:
-        user = db.query(users).filter(users.id == sid).first()
-        if not user:
-            continue
-
-        user_enrolls = db.query(enrollments).filter(enrollments.student_id == sid).all()
-
-        result.append(
-            StudentRead(
-                id=user.id,
-                email=user.email,
-                full_name=user.full_name,
-                role=user.role,
-                enrollments=user_enrolls
-            )
+def list_students(
+    response: Response,
+    batch_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    enrolled = select(enrollments.student_id)
+    if batch_id is not None:
+        enrolled = enrolled.where(enrollments.batch_id == batch_id)
+    if is_active is not None:
+        enrolled = enrolled.where(enrollments.is_active == is_active)
+
+    page_ids = keyset(select(users.id).where(users.id.in_(enrolled)), [users.created_at, users.id], page).subquery()
+
+    # one round trip: the page of students joined to all of their enrollments
+    rows = db.execute(
+        select(users, enrollments)
+        .join(page_ids, page_ids.c.id == users.id)
+        .join(enrollments, enrollments.student_id == users.id)
+        .order_by(users.created_at, users.id, enrollments.id)
+    ).all()
+
+    students: Dict[int, users] = {}
+    student_enrollments: Dict[int, List[enrollments]] = {}
+
+    for user, enroll in rows:
+        students.setdefault(user.id, user)
+        student_enrollments.setdefault(user.id, []).append(enroll)
+
+    page_users, next_cursor = page_of(students.values(), page, created_key)
+    set_next_cursor(response, next_cursor)
+
+    return [
+        StudentRead(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            enrollments=student_enrollments[user.id]
         )
-
-    return result
+        for user in page_users
+    ]
 
 @router.put("/enrollments/{enrollment_id}", response_model=EnrollmentRead)
 def update_enrollment(enrollment_id: int, payload: EnrollmentUpdate, db: Session = Depends(get_db)):
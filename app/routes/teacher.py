@@ -1,6 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.core.etag import not_modified, version_query
+from app.core.serialization import dump_model, dump_models, json_response
+from app.db.pagination import PageParams, keyset, page_of, set_next_cursor, created_key
+from app.db.session import get_db, get_read_db
 from app.models.models import users, teachers
 from app.schema import TeacherCreate, TeacherUpdate, TeacherRead
 
@@ -13,10 +18,6 @@ def create_teacher(user_id: int, payload: TeacherCreate, db: Session = Depends(g
     if not user:
         raise HTTPException(404, "User not found")
 
-    existing = db.query(teachers).filter(teachers.user_id == user_id).first()
-    if existing:
-        raise HTTPException(400, "Teacher profile already exists")
-
     teacher = teachers(
         user_id=user_id,
         subjects=",".join(payload.subjects),
@@ -25,51 +26,42 @@ def create_teacher(user_id: int, payload: TeacherCreate, db: Session = Depends(g
     )
 
     db.add(teacher)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(400, "Teacher profile already exists")
     db.refresh(teacher)
 
-    return TeacherRead(
-        id=teacher.id,
-        user_id=user_id,
-        subjects=teacher.subjects.split(",") if teacher.subjects else [],
-        experience=teacher.experience,
-        qualifications=teacher.qualifications,
-        created_at=teacher.created_at,
-    )
+    return json_response(dump_model(TeacherRead, teacher))
 
 @router.get("/user/{user_id}", response_model=TeacherRead)
-def get_teacher(user_id: int, db: Session = Depends(get_db)):
+def get_teacher(user_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
 
     teacher = db.query(teachers).filter(teachers.user_id == user_id).first()
     if not teacher:
         raise HTTPException(404, "Teacher not found")
 
-    return TeacherRead(
-        id=teacher.id,
-        user_id=teacher.user_id,
-        subjects=teacher.subjects.split(",") if teacher.subjects else [],
-        experience=teacher.experience,
-        qualifications=teacher.qualifications,
-        created_at=teacher.created_at,
-    )
+    cached = not_modified(request, response, "teacher", teacher.id, teacher.updated_at, last_modified=teacher.updated_at)
+    if cached:
+        return cached
+
+    return json_response(dump_model(TeacherRead, teacher), response)
 
 
 @router.get("/", response_model=list[TeacherRead])
-def list_teachers(db: Session = Depends(get_db)):
+def list_teachers(request: Request, response: Response, page: PageParams = Depends(), db: Session = Depends(get_read_db)):
 
-    teachers_list = db.query(teachers).all()
+    count, updated = db.execute(version_query(select(teachers), teachers.updated_at)).one()
+    cached = not_modified(request, response, "teachers", page.cursor, page.limit, count, updated)
+    if cached:
+        return cached
 
-    return [
-        TeacherRead(
-            id=t.id,
-            user_id=t.user_id,
-            subjects=t.subjects.split(",") if t.subjects else [],
-            experience=t.experience,
-            qualifications=t.qualifications,
-            created_at=t.created_at,
-        )
-        for t in teachers_list
-    ]
+    rows = db.scalars(keyset(select(teachers), [teachers.created_at, teachers.id], page)).all()
+    teachers_list, next_cursor = page_of(rows, page, created_key)
+    set_next_cursor(response, next_cursor)
+
+    return json_response(dump_models(TeacherRead, teachers_list), response)
 
 
 @router.put("/{teacher_id}", response_model=TeacherRead)
@@ -86,14 +78,7 @@ def update_teacher(teacher_id: int, payload: TeacherUpdate, db: Session = Depend
     db.commit()
     db.refresh(teacher)
 
-    return TeacherRead(
-        id=teacher.id,
-        user_id=teacher.user_id,
-        subjects=teacher.subjects.split(",") if teacher.subjects else [],
-        experience=teacher.experience,
-        qualifications=teacher.qualifications,
-        created_at=teacher.created_at,
-    )
+    return json_response(dump_model(TeacherRead, teacher))
 
 
 @router.delete("/{teacher_id}", status_code=204)
@@ -1,11 +1,19 @@
+from collections import defaultdict
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import Time, and_, literal, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
-from app.models.models import timetable_slots, teachers, batches, users
-from app.schema import SlotCreate, SlotUpdate, SlotRead
+from app.core.etag import not_modified, version_query
+from app.core.serialization import dump_model, dump_models, json_response
+from app.db.bulk import existing
+from app.db.session import get_db, get_read_db
+from app.models.models import timetable_slots, teachers, batches, users, RoleEnum, slot_period
+from app.schema import SlotCreate, SlotUpdate, SlotRead, SlotBulkUpdate
 from app.core.authen import get_current_user
+from app.dependencies.access import batches_being_deleted, get_writable_batch
+from app.dependencies.role import require_roles
 
 router = APIRouter(prefix="/timetable", tags=["timetable"])
 
@@ -18,6 +26,91 @@ def _is_teacher(u):
     return getattr(u, "role", "") == "teacher"
 
 
+def teacher_slots_query(teacher_id: int, day: Optional[str]):
+    stmt = select(timetable_slots).where(timetable_slots.teacher_id == teacher_id)
+
+    if day:
+        stmt = stmt.where(timetable_slots.day == day)
+
+    return stmt.order_by(timetable_slots.day, timetable_slots.start_time)
+
+
+# Same spelling as the exclusion constraints, so each branch of the OR is an
+# index scan on one of their GiST indexes.
+def conflicting_slots_query(slot, exclude_ids=()):
+    period = slot_period(timetable_slots.start_time, timetable_slots.end_time).op("&&")(
+        slot_period(literal(slot.start_time, Time), literal(slot.end_time, Time))
+    )
+    stmt = select(timetable_slots).where(or_(
+        and_(timetable_slots.teacher_id == slot.teacher_id, timetable_slots.day == slot.day, period),
+        and_(timetable_slots.class_id == slot.class_id, timetable_slots.day == slot.day, period),
+    ))
+    if exclude_ids:
+        stmt = stmt.where(timetable_slots.id.notin_(exclude_ids))
+    return stmt.limit(1)
+
+
+def conflict_message(slot, other):
+    if other.teacher_id == slot.teacher_id:
+        return "Teacher is already booked at this time"
+    return "Class already has a slot at this time"
+
+
+def check_slot(db: Session, slot, exclude_ids=()):
+    if slot.end_time <= slot.start_time:
+        raise HTTPException(400, "end_time must be after start_time")
+
+    other = db.scalars(conflicting_slots_query(slot, exclude_ids)).first()
+    if other is not None:
+        raise HTTPException(400, conflict_message(slot, other))
+
+
+# Whatever got past check_slot (a concurrent write, a row deleted meanwhile)
+# is reported by the constraint Postgres names in the error.
+SLOT_CONSTRAINTS = {
+    "ex_timetable_slots_teacher_overlap": (400, "Teacher is already booked at this time"),
+    "ex_timetable_slots_class_overlap": (400, "Class already has a slot at this time"),
+    "timetable_slots_teacher_id_fkey": (404, "Teacher not found"),
+    "timetable_slots_class_id_fkey": (404, "Class not found"),
+}
+
+
+def slot_integrity_error(e: IntegrityError):
+    message = str(e.orig)
+    for name, (status_code, detail) in SLOT_CONSTRAINTS.items():
+        if name in message:
+            return HTTPException(status_code, detail)
+    return HTTPException(400, "Slot conflicts with an existing slot")
+
+
+def commit_slots(db: Session):
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise slot_integrity_error(e)
+
+
+# The in-memory version of the constraints, for a whole set of slots at once:
+# per (teacher, day) and (class, day), sorted by start, each slot is only
+# compared with the ones that have not ended by the time it starts.
+def find_conflicts(slots):
+    conflicts = []
+    for field in ("teacher_id", "class_id"):
+        groups = defaultdict(list)
+        for slot in slots:
+            groups[(getattr(slot, field), slot.day)].append(slot)
+
+        for group in groups.values():
+            group.sort(key=lambda s: s.start_time)
+            running = []
+            for slot in group:
+                running = [s for s in running if s.end_time > slot.start_time]
+                conflicts.extend((field, other, slot) for other in running)
+                running.append(slot)
+    return conflicts
+
+
 @router.post("/teachers/{teacher_id}", response_model=SlotRead)
 def create_slot(
     teacher_id: int,
@@ -32,18 +125,7 @@ def create_slot(
     if not t:
         raise HTTPException(404, "Teacher not found")
 
-    c = db.query(batches).filter(batches.id == payload.class_id).first()
-    if not c:
-        raise HTTPException(404, "Class not found")
-
-    conflict = db.query(timetable_slots).filter(
-        timetable_slots.class_id == payload.class_id,
-        timetable_slots.day == payload.day,
-        timetable_slots.start_time == payload.start_time,
-    ).first()
-
-    if conflict:
-        raise HTTPException(400, "Slot already exists for this class at this time")
+    get_writable_batch(db, payload.class_id, "Class not found")
 
     row = timetable_slots(
         teacher_id=teacher_id,
@@ -53,9 +135,10 @@ def create_slot(
         start_time=payload.start_time,
         end_time=payload.end_time,
     )
+    check_slot(db, row)
 
     db.add(row)
-    db.commit()
+    commit_slots(db)
     db.refresh(row)
 
     return SlotRead.model_validate(row)
@@ -63,27 +146,29 @@ def create_slot(
 
 @router.get("/teachers/me", response_model=List[SlotRead])
 def get_my_slots(
+    request: Request,
+    response: Response,
     day: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user=Depends(get_current_user),
 ):
     tr = db.query(teachers).filter(teachers.user_id == current_user.id).first()
     if not tr:
         raise HTTPException(404, "Teacher not found")
 
-    q = db.query(timetable_slots).filter(timetable_slots.teacher_id == tr.id)
+    count, updated = db.execute(version_query(teacher_slots_query(tr.id, day), timetable_slots.updated_at)).one()
+    cached = not_modified(request, response, "teacher_slots", tr.id, day, count, updated)
+    if cached:
+        return cached
 
-    if day:
-        q = q.filter(timetable_slots.day == day)
-
-    rows = q.order_by(timetable_slots.day, timetable_slots.start_time).all()
-    return [SlotRead.model_validate(r) for r in rows]
+    rows = db.scalars(teacher_slots_query(tr.id, day)).all()
+    return json_response(dump_models(SlotRead, rows), response)
 
 
 @router.get("/classes/me", response_model=List[SlotRead])
 def get_class_slots(
     day: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user=Depends(get_current_user),
 ):
     st = db.query(users).filter(
@@ -104,15 +189,19 @@ def get_class_slots(
         q = q.filter(timetable_slots.day == day)
 
     rows = q.order_by(timetable_slots.day, timetable_slots.start_time).all()
-    return [SlotRead.model_validate(r) for r in rows]
+    return json_response(dump_models(SlotRead, rows))
 
 
 @router.get("/{slot_id}", response_model=SlotRead)
-def get_slot(slot_id: int, db: Session = Depends(get_db)):
+def get_slot(slot_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
     row = db.query(timetable_slots).filter(timetable_slots.id == slot_id).first()
     if not row:
         raise HTTPException(404, "Slot not found")
-    return SlotRead.model_validate(row)
+
+    cached = not_modified(request, response, "slot", row.id, row.updated_at, last_modified=row.updated_at)
+    if cached:
+        return cached
+    return json_response(dump_model(SlotRead, row), response)
 
 
 @router.put("/{slot_id}", response_model=SlotRead)
@@ -134,10 +223,16 @@ def update_slot(
         raise HTTPException(403, "Not allowed")
 
     data = payload.dict(exclude_none=True)
+    if "teacher_id" in data and not db.query(teachers.id).filter(teachers.id == data["teacher_id"]).first():
+        raise HTTPException(404, "Teacher not found")
+    if "class_id" in data:
+        get_writable_batch(db, data["class_id"], "Class not found")
+
     for k, v in data.items():
         setattr(row, k, v)
+    check_slot(db, row, [row.id])
 
-    db.commit()
+    commit_slots(db)
     db.refresh(row)
     return SlotRead.model_validate(row)
 
@@ -162,3 +257,72 @@ def delete_slot(
     db.delete(row)
     db.commit()
     return {"message": "Deleted"}
+
+
+# Timetable edits for a whole term in one request: validated together in
+# memory, then against what is stored for the same teachers, classes and days
+# (minus the slots being edited), and written in one transaction.
+@router.post("/slots:bulk", response_model=List[SlotRead])
+def bulk_save_slots(
+    payload: SlotBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_roles(RoleEnum.ADMIN)),
+):
+    items = payload.slots
+    edit_ids = [s.id for s in items if s.id is not None]
+
+    rows = {r.id: r for r in db.scalars(select(timetable_slots).where(timetable_slots.id.in_(edit_ids)))} if edit_ids else {}
+    missing = [i for i in edit_ids if i not in rows]
+    if missing:
+        raise HTTPException(404, f"Slots not found: {', '.join(map(str, missing))}")
+
+    missing = set(s.teacher_id for s in items) - existing(db, teachers.id, (s.teacher_id for s in items))
+    if missing:
+        raise HTTPException(404, f"Teachers not found: {', '.join(map(str, sorted(missing)))}")
+    missing = set(s.class_id for s in items) - existing(db, batches.id, (s.class_id for s in items))
+    if missing:
+        raise HTTPException(404, f"Classes not found: {', '.join(map(str, sorted(missing)))}")
+    deleting = batches_being_deleted(db, (s.class_id for s in items))
+    if deleting:
+        raise HTTPException(409, f"Classes being deleted: {', '.join(map(str, sorted(deleting)))}")
+
+    stored = db.scalars(select(timetable_slots).where(
+        timetable_slots.day.in_({s.day for s in items}),
+        or_(timetable_slots.teacher_id.in_({s.teacher_id for s in items}), timetable_slots.class_id.in_({s.class_id for s in items})),
+        timetable_slots.id.notin_(edit_ids),
+    )).all()
+
+    position = {id(s): i for i, s in enumerate(items)}
+
+    def describe(slot):
+        return f"slots[{position[id(slot)]}]" if id(slot) in position else f"slot {slot.id}"
+
+    conflicts = [
+        {"field": field, "slots": [describe(a), describe(b)]}
+        for field, a, b in find_conflicts(stored + list(items))
+        if id(a) in position or id(b) in position
+    ]
+    if conflicts:
+        raise HTTPException(400, {"message": "Slots overlap", "conflicts": conflicts})
+
+    saved = []
+    for item in items:
+        values = item.model_dump(exclude={"id"})
+        row = rows.get(item.id) or timetable_slots()
+        for k, v in values.items():
+            setattr(row, k, v)
+        db.add(row)
+        saved.append(row)
+
+    # commit expires every row, so serialize first: the flush assigns ids and
+    # one SELECT loads the server-side columns for all of them
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        raise slot_integrity_error(e)
+    db.scalars(select(timetable_slots).where(timetable_slots.id.in_([row.id for row in saved])).execution_options(populate_existing=True)).all()
+    body = dump_models(SlotRead, saved)
+
+    commit_slots(db)
+    return json_response(body)
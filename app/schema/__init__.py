@@ -13,13 +13,23 @@ from .schema import (
     EnrollmentCreate,
     EnrollmentUpdate,
     EnrollmentRead,
+    BulkEnrollmentCreate,
+    BulkEnrollmentRead,
     StudentRead,
     ContentRead,
     CommentCreate,
     CommentRead,
     NotificationCreate,
     NotificationRead,
+    BroadcastRead,
+    UnreadCount,
+    StreamTicket,
+    ImportRowError,
+    ImportReport,
+    JobRead,
     SlotCreate,
     SlotUpdate,
+    SlotBulkItem,
+    SlotBulkUpdate,
     SlotRead,
 )
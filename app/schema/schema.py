@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import datetime, time
 from typing import Optional, List
-from pydantic import BaseModel, ConfigDict
-from ..models.models import RoleEnum, ContentTypeEnum, PaymentStatusEnum
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from ..models.models import RoleEnum, ContentTypeEnum, PaymentStatusEnum, AudienceEnum
 
 
 class User(BaseModel):
@@ -94,6 +94,14 @@ class TeacherRead(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+    # stored as a comma separated string on teachers.subjects
+    @field_validator("subjects", mode="before")
+    @classmethod
+    def split_subjects(cls, value):
+        if isinstance(value, str):
+            return value.split(",") if value else []
+        return value or []
+
 class TeacherUpdate(BaseModel):
     subjects: Optional[List[str]] = None
     experience: Optional[int] = None
@@ -104,6 +112,16 @@ class EnrollmentCreate(BaseModel):
     batch_id: int
     role_in_batch: Optional[str] = "student"
 
+class BulkEnrollmentCreate(BaseModel):
+    student_ids: List[int] = Field(min_length=1, max_length=10000)
+    role_in_batch: Optional[str] = "student"
+
+class BulkEnrollmentRead(BaseModel):
+    batch_id: int
+    enrolled: List[int] = []
+    already_enrolled: List[int] = []
+    not_found: List[int] = []
+
 class EnrollmentRead(BaseModel):
     id: int
     batch_id: int
@@ -162,14 +180,17 @@ class NotificationCreate(BaseModel):
    
     recipient_id: Optional[int] = None
     batch_id: Optional[int] = None
+    role: Optional[RoleEnum] = None
     title: Optional[str] = None
     message: str
     channel: Optional[str] = "in-app" 
     is_public: Optional[bool] = False
+    fanout: bool = False
 
 
 class NotificationRead(BaseModel):
     id: int
+    kind: str = "direct"
     recipient_id: int
     title: Optional[str] = None
     message: str
@@ -180,13 +201,55 @@ class NotificationRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UnreadCount(BaseModel):
+    unread: int
+    read_through_at: Optional[datetime] = None
+
+
+class StreamTicket(BaseModel):
+    ticket: str
+    expires_in: int
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    inserted: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+
+
+class BroadcastRead(BaseModel):
+    id: int
+    audience: AudienceEnum
+    batch_id: Optional[int] = None
+    role: Optional[RoleEnum] = None
+    sender_id: Optional[int] = None
+    title: Optional[str] = None
+    message: str
+    channel: str
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class SlotCreate(BaseModel):
     teacher_id: int
     class_id: int
     subject_id: int
     day: str
-    start_time: str
-    end_time: str
+    start_time: time
+    end_time: time
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        return self
 
 
 class SlotUpdate(BaseModel):
@@ -194,8 +257,16 @@ class SlotUpdate(BaseModel):
     class_id: Optional[int] = None
     subject_id: Optional[int] = None
     day: Optional[str] = None
-    start_time: Optional[str] = None
-    end_time: Optional[str] = None
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+
+
+class SlotBulkItem(SlotCreate):
+    id: Optional[int] = None
+
+
+class SlotBulkUpdate(BaseModel):
+    slots: List[SlotBulkItem] = Field(min_length=1, max_length=1000)
 
 
 class SlotRead(BaseModel):
@@ -204,8 +275,8 @@ class SlotRead(BaseModel):
     class_id: int
     subject_id: int
     day: str
-    start_time: str
-    end_time: str
+    start_time: time
+    end_time: time
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -249,6 +320,32 @@ class BatchRead(BaseModel):
     class Config:
         orm_mode = True
 
+class BatchDeletionRead(BaseModel):
+    id: int
+    batch_id: int
+    status: str
+    step: Optional[str] = None
+    progress: dict = {}
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: dict = {}
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
 class BatchUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -0,0 +1,215 @@
+"""Before/after benchmark for the composite indexes.
+
+Seeds a scratch Postgres database and runs the hot queries twice: once with
+the old single column indexes (swapped in inside a transaction that is
+rolled back) and once with the schema as it is in app/models. For each
+query it prints the top plan node, the index used and the median latency.
+
+    BENCH_DATABASE_URL=postgresql://localhost/cbackend_bench python scripts/bench_indexes.py --seed
+
+Only point this at a database you can throw away: --seed drops and
+recreates every table.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import create_engine, text
+
+from app.db.base import Base
+import app.models.models  # noqa: F401  registers the tables
+
+PERIOD = "tsrange(DATE '2000-01-01' + {0}.start_time, DATE '2000-01-01' + {0}.end_time)"
+
+SEED = [
+    "INSERT INTO users (firebase_uid, email, role) "
+    "SELECT 'uid-' || g, 'user' || g || '@example.com', "
+    "CASE WHEN g % 50 = 0 THEN 'TEACHER' ELSE 'STUDENT' END::roleenum "
+    "FROM generate_series(1, :users) g",
+    "INSERT INTO batches (name, is_active) SELECT 'batch ' || g, true FROM generate_series(1, :batches) g",
+    "INSERT INTO teachers (user_id) SELECT id FROM users WHERE role = 'TEACHER'",
+    "INSERT INTO enrollments (batch_id, student_id, is_active) "
+    "SELECT (u.id * 7 + k) % :batches + 1, u.id, (u.id + k) % 10 <> 0 "
+    "FROM users u CROSS JOIN generate_series(0, 2) k WHERE u.role = 'STUDENT' "
+    "ON CONFLICT DO NOTHING",
+    "INSERT INTO contents (title, storage_url, uploader_id, batch_id, is_public, created_at) "
+    "SELECT 'content ' || g, 'https://cdn.example.com/' || g, 50, g % :batches + 1, g % 3 = 0, "
+    "now() - (g || ' minutes')::interval FROM generate_series(1, :contents) g",
+    "INSERT INTO comments (content_id, author_id, text, is_public, created_at) "
+    "SELECT g % :contents + 1, g % :users + 1, 'comment ' || g, g % 4 <> 0, "
+    "now() - (g || ' seconds')::interval FROM generate_series(1, :comments) g",
+    "INSERT INTO notifications (recipient_id, message, channel, is_read, created_at) "
+    "SELECT g % :users + 1, 'notification ' || g, 'in-app', g % 5 = 0, "
+    "date_trunc('month', now()) + ((g % 600) || ' minutes')::interval FROM generate_series(1, :notifications) g",
+    "INSERT INTO batch_teachers (batch_id, teacher_id) "
+    "SELECT b.id, t.id FROM batches b JOIN teachers t ON t.id % 20 = b.id % 20",
+    "INSERT INTO timetable_slots (teacher_id, class_id, subject_id, day, start_time, end_time) "
+    "SELECT t.id, b.id, 1, d, make_time(8 + (t.id + b.id) % 9, 0, 0), make_time(9 + (t.id + b.id) % 9, 0, 0) "
+    "FROM batch_teachers bt JOIN teachers t ON t.id = bt.teacher_id JOIN batches b ON b.id = bt.batch_id "
+    "CROSS JOIN unnest(ARRAY['mon', 'tue', 'wed', 'thu', 'fri']) d",
+    # the overlap constraints are deferred, so clashes can go before commit
+    f"DELETE FROM timetable_slots a USING timetable_slots b "
+    f"WHERE a.id > b.id AND a.day = b.day AND (a.teacher_id = b.teacher_id OR a.class_id = b.class_id) "
+    f"AND {PERIOD.format('a')} && {PERIOD.format('b')}",
+]
+
+# what the tables looked like before the composite indexes
+OLD_INDEXES = {
+    "drop": [
+        "ALTER TABLE batch_teachers DROP CONSTRAINT uq_batch_teacher",
+        "ALTER TABLE timetable_slots DROP CONSTRAINT ex_timetable_slots_class_overlap",
+        "ALTER TABLE timetable_slots DROP CONSTRAINT ex_timetable_slots_teacher_overlap",
+        "DROP INDEX ix_timetable_slots_class_day_start",
+        "DROP INDEX uq_enrollments_batch_student",
+        "DROP INDEX ix_enrollments_student_active",
+        "DROP INDEX ix_contents_batch_created",
+        "DROP INDEX ix_comments_content_public_created",
+        "DROP INDEX ix_timetable_slots_teacher_day_start",
+        "DROP INDEX ix_notifications_recipient_created",
+        "DROP INDEX ix_batch_teachers_teacher_id",
+    ],
+    "create": [
+        "CREATE INDEX ix_enrollments_batch_id ON enrollments (batch_id)",
+        "CREATE INDEX ix_enrollments_student_id ON enrollments (student_id)",
+        "CREATE INDEX ix_contents_batch_id ON contents (batch_id)",
+        "CREATE INDEX ix_comments_content_id ON comments (content_id)",
+        "CREATE INDEX ix_timetable_slots_class_id ON timetable_slots (class_id)",
+        "CREATE INDEX ix_timetable_slots_teacher_id ON timetable_slots (teacher_id)",
+        "CREATE INDEX ix_notifications_recipient_id ON notifications (recipient_id)",
+    ],
+}
+
+QUERIES = {
+    "active_enrollment": (
+        "SELECT id FROM enrollments WHERE batch_id = :batch AND student_id = :student AND is_active LIMIT 1"
+    ),
+    "my_batches": "SELECT batch_id FROM enrollments WHERE student_id = :student AND is_active",
+    "batch_contents": (
+        "SELECT * FROM contents WHERE batch_id = :batch ORDER BY created_at DESC, id DESC LIMIT 101"
+    ),
+    "public_comments": (
+        "SELECT * FROM comments WHERE content_id = :content AND is_public ORDER BY created_at, id LIMIT 101"
+    ),
+    "my_notifications": (
+        "SELECT * FROM notifications WHERE recipient_id = :student "
+        "AND created_at >= now() - interval '180 days' ORDER BY created_at DESC, id DESC LIMIT 101"
+    ),
+    "class_slot_conflict": (
+        "SELECT id FROM timetable_slots t WHERE t.class_id = :batch AND t.day = 'mon' "
+        f"AND {PERIOD.format('t')} && tsrange(DATE '2000-01-01' + time '10:00', DATE '2000-01-01' + time '11:00') LIMIT 1"
+    ),
+    "teacher_slots": "SELECT * FROM timetable_slots WHERE teacher_id = :teacher AND day = 'tue' ORDER BY start_time",
+    "batch_teacher": "SELECT id FROM batch_teachers WHERE batch_id = :batch AND teacher_id = :teacher LIMIT 1",
+}
+
+
+def seed(engine, sizes):
+    # needs settings, so only after main() has pointed DATABASE_URL here
+    from app.db.partitions import ensure_partitions
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        ensure_partitions(conn, "notifications", 1)
+        for statement in SEED:
+            conn.execute(text(statement), sizes)
+        conn.execute(text("ANALYZE"))
+
+
+def sample_params(conn):
+    row = conn.execute(text(
+        "SELECT e.batch_id AS batch, e.student_id AS student, "
+        "(SELECT id FROM contents WHERE batch_id = e.batch_id LIMIT 1) AS content, "
+        "(SELECT teacher_id FROM batch_teachers WHERE batch_id = e.batch_id LIMIT 1) AS teacher "
+        "FROM enrollments e WHERE e.is_active ORDER BY e.id LIMIT 1 OFFSET 1000"
+    )).mappings().one()
+    return dict(row)
+
+
+def index_names(node):
+    names = set()
+    if "Index Name" in node:
+        names.add(node["Index Name"])
+    for child in node.get("Plans", ()):
+        names |= index_names(child)
+    return names
+
+
+def measure(conn, sql, params, runs):
+    plan = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).all()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "node": root["Node Type"],
+        "indexes": ", ".join(sorted(index_names(root))) or "-",
+        "buffers": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+        "ms": statistics.median(timings),
+    }
+
+
+def run(engine, runs):
+    results = {}
+    with engine.connect() as conn:
+        params = sample_params(conn)
+        conn.rollback()
+
+        with conn.begin() as tx:
+            for statement in OLD_INDEXES["drop"] + OLD_INDEXES["create"]:
+                conn.execute(text(statement))
+            conn.execute(text("ANALYZE"))
+            for name, sql in QUERIES.items():
+                results[name] = {"before": measure(conn, sql, params, runs)}
+            tx.rollback()
+
+        with conn.begin():
+            for name, sql in QUERIES.items():
+                results[name]["after"] = measure(conn, sql, params, runs)
+    return results
+
+
+def report(results):
+    print(f"{'query':<22} {'':<7} {'plan':<18} {'buffers':>8} {'median ms':>10}  indexes")
+    for name, result in results.items():
+        for label in ("before", "after"):
+            r = result[label]
+            print(f"{name if label == 'before' else '':<22} {label:<7} {r['node']:<18} {r['buffers']:>8} {r['ms']:>10.3f}  {r['indexes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.environ.get("BENCH_DATABASE_URL"))
+    parser.add_argument("--seed", action="store_true", help="drop, recreate and seed every table first")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--batches", type=int, default=2_000)
+    parser.add_argument("--contents", type=int, default=200_000)
+    parser.add_argument("--comments", type=int, default=1_000_000)
+    parser.add_argument("--notifications", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    if not args.url or not args.url.startswith("postgresql"):
+        parser.error("a Postgres --url (or BENCH_DATABASE_URL) is required")
+
+    os.environ.setdefault("DATABASE_URL", args.url)
+    engine = create_engine(args.url)
+    if args.seed:
+        seed(engine, {k: getattr(args, k) for k in ("users", "batches", "contents", "comments", "notifications")})
+
+    report(run(engine, args.runs))
+
+
+if __name__ == "__main__":
+    main()
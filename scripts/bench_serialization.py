@@ -0,0 +1,102 @@
+"""Microbenchmark for the content listing serialization paths.
+
+Seeds an in-memory SQLite database with contents rows and times one page
+through each way the routes have turned rows into JSON:
+
+    orm      ORM objects, model_validate per item, jsonable_encoder, json.dumps
+    models   ORM objects validated once as a list and dumped by pydantic-core
+    rows     column tuples from app.core.serialization.dump_rows (orjson)
+
+    python scripts/bench_serialization.py --rows 500 --runs 200
+
+Numbers are per item, so they only compare paths against each other; the
+database round trip is included in every path.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.serialization import dump_models, dump_rows, model_columns, orjson
+from app.models.models import contents
+from app.schema import ContentRead
+
+
+def seed(engine, size):
+    contents.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(contents), [
+            {
+                "title": f"content {i}",
+                "description": "lecture notes " * 4,
+                "storage_url": f"https://cdn.example.com/{i}",
+                "uploader_id": 1,
+                "batch_id": i % 20 + 1,
+                "is_public": i % 3 == 0,
+            }
+            for i in range(size)
+        ])
+
+
+def orm_path(session, limit):
+    rows = session.scalars(select(contents).limit(limit)).all()
+    return json.dumps(jsonable_encoder([ContentRead.model_validate(r) for r in rows])).encode()
+
+
+def models_path(session, limit):
+    return dump_models(ContentRead, session.scalars(select(contents).limit(limit)).all())
+
+
+def rows_path(session, limit):
+    return dump_rows(session.execute(select(*model_columns(ContentRead, contents.__table__)).limit(limit)).all())
+
+
+PATHS = {"orm": orm_path, "models": models_path, "rows": rows_path}
+
+
+def measure(engine, path, limit, runs):
+    timings = []
+    for _ in range(runs):
+        # a fresh session each run, like a request, so the identity map is cold
+        with Session(engine) as session:
+            start = time.perf_counter()
+            body = path(session, limit)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6 / limit, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500, help="items per page")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    seed(engine, args.rows)
+
+    # every path has to produce the same document
+    with Session(engine) as session:
+        bodies = {name: json.loads(path(session, args.rows)) for name, path in PATHS.items()}
+    if any(body != bodies["orm"] for body in bodies.values()):
+        sys.exit("serialization paths disagree")
+
+    print(f"orjson: {'yes' if orjson is not None else 'no, pydantic-core fallback'}")
+    print(f"{'path':<8} {'us/item':>9} {'bytes':>9}")
+    baseline = None
+    for name, path in PATHS.items():
+        per_item, size = measure(engine, path, args.rows, args.runs)
+        baseline = baseline or per_item
+        print(f"{name:<8} {per_item:>9.2f} {size:>9}  {baseline / per_item:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+# Settings are read at import time, so the database has to be chosen before
+# anything from app is imported; never whatever DATABASE_URL points at. Only
+# the tables a test needs are created: several others use Postgres-only DDL.
+DB_PATH = os.path.join(tempfile.gettempdir(), "cbackend-tests.db")
+if os.path.exists(DB_PATH):
+    os.remove(DB_PATH)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.pop("READ_REPLICA_URL", None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.session import engine
+from app.main import app
+
+
+@pytest.fixture
+def tables():
+    created = []
+
+    def create(*models):
+        for model in models:
+            model.__table__.create(engine)
+            created.append(model.__table__)
+
+    yield create
+    for table in reversed(created):
+        table.drop(engine)
+
+
+@pytest.fixture
+def client():
+    # not entered as a context manager: the lifespan needs Postgres
+    return TestClient(app)
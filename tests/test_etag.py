@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import Request, Response
+from sqlalchemy import insert, update
+
+from app.core.etag import is_fresh, make_etag, not_modified
+from app.db.session import engine
+from app.models.models import teachers, users
+
+ETAG = make_etag("teachers", None, 100, 3, datetime(2026, 1, 1))
+UPDATED = datetime(2026, 1, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)
+
+
+def request(**headers):
+    return Request({"type": "http", "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]})
+
+
+def test_etag_is_weak_and_follows_its_parts():
+    assert ETAG.startswith('W/"')
+    assert ETAG == make_etag("teachers", None, 100, 3, datetime(2026, 1, 1))
+    assert ETAG != make_etag("teachers", None, 100, 4, datetime(2026, 1, 1))
+
+
+@pytest.mark.parametrize("if_none_match, fresh", [
+    (ETAG, True),
+    (ETAG.removeprefix("W/"), True),
+    (f'W/"other", {ETAG}', True),
+    ("*", True),
+    ('W/"other"', False),
+    ("", False),
+])
+def test_if_none_match_uses_weak_comparison(if_none_match, fresh):
+    assert is_fresh(request(if_none_match=if_none_match), ETAG) is fresh
+
+
+@pytest.mark.parametrize("if_modified_since, fresh", [
+    ("Thu, 01 Jan 2026 12:00:00 GMT", True),
+    ("Thu, 01 Jan 2026 13:00:00 GMT", True),
+    ("Thu, 01 Jan 2026 11:59:59 GMT", False),
+    ("not a date", False),
+])
+def test_if_modified_since_has_second_precision(if_modified_since, fresh):
+    assert is_fresh(request(if_modified_since=if_modified_since), ETAG, UPDATED) is fresh
+
+
+def test_if_none_match_wins_over_if_modified_since():
+    stale = request(if_none_match='W/"other"', if_modified_since="Thu, 01 Jan 2026 13:00:00 GMT")
+    assert is_fresh(stale, ETAG, UPDATED) is False
+
+
+def test_no_validators_is_never_fresh():
+    assert is_fresh(request(), ETAG, UPDATED) is False
+    assert is_fresh(request(if_modified_since="Thu, 01 Jan 2026 13:00:00 GMT"), ETAG) is False
+
+
+def test_not_modified_returns_a_304_with_the_validators():
+    response = Response()
+    cached = not_modified(request(if_none_match=ETAG), response, "teachers", None, 100, 3, datetime(2026, 1, 1))
+
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == ETAG
+    assert cached.headers["Cache-Control"] == "no-cache"
+    assert "last-modified" not in cached.headers
+
+
+def test_not_modified_sets_the_validators_on_a_full_response():
+    response = Response()
+    assert not_modified(request(), response, "teacher", 1, last_modified=UPDATED) is None
+
+    assert response.headers["ETag"] == make_etag("teacher", 1)
+    assert response.headers["Last-Modified"] == "Thu, 01 Jan 2026 12:00:00 GMT"
+
+
+def test_listing_is_revalidated_until_it_changes(client, tables):
+    tables(users, teachers)
+    with engine.begin() as conn:
+        conn.execute(insert(users.__table__), [{"firebase_uid": "uid", "email": "t@example.com"}])
+        conn.execute(insert(teachers.__table__), [{"user_id": 1, "updated_at": datetime(2026, 1, 1)}])
+
+    first = client.get("/teachers/")
+    assert first.status_code == 200
+    assert "last-modified" not in first.headers
+
+    again = client.get("/teachers/", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+
+    with engine.begin() as conn:
+        conn.execute(update(teachers.__table__).values(updated_at=datetime(2026, 1, 2)))
+    changed = client.get("/teachers/", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
@@ -0,0 +1,85 @@
+import base64
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from app.db.pagination import NEXT_CURSOR_HEADER, PageParams, created_key, decode_cursor, encode_cursor, page_of
+from app.db.session import engine
+from app.models.models import teachers, users
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@pytest.mark.parametrize("payload", [
+    ["2026-01-01T00:00:00", 3],
+    [{"dt": "2026-01-01T00:00:00"}, "3"],
+    [{"dt": "2026-01-01T00:00:00"}, True],
+    [{"dt": "2026-01-01T00:00:00"}],
+])
+def test_cursor_with_wrong_key_values_is_rejected(payload):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(raw_cursor(payload), [datetime, int])
+
+    assert error.value.status_code == 400
+    assert error.value.detail == "Invalid cursor"
+
+
+def test_wrong_cursor_types_are_a_400_not_a_database_error(client, tables):
+    tables(users, teachers)
+    response = client.get("/teachers/", params={"cursor": raw_cursor(["yesterday", 1])})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_well_formed_cursor_is_accepted(client, tables):
+    tables(users, teachers)
+    response = client.get("/teachers/", params={"cursor": encode_cursor((datetime(2026, 1, 1), 1))})
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("values", [
+    (datetime(2026, 3, 1, 8, 30, 15, 123456), 42),
+    (datetime(2026, 3, 1, 8, 30, tzinfo=timezone.utc), "broadcast", 7),
+])
+def test_cursor_round_trip(values):
+    assert tuple(decode_cursor(encode_cursor(values), [type(v) for v in values])) == values
+
+
+def test_page_of_emits_a_cursor_only_when_there_is_another_page():
+    rows = [SimpleNamespace(created_at=datetime(2026, 1, 1), id=i) for i in range(1, 4)]
+
+    page, next_cursor = page_of(rows, PageParams(limit=2), created_key)
+    assert [r.id for r in page] == [1, 2]
+    assert decode_cursor(next_cursor, [datetime, int]) == [datetime(2026, 1, 1), 2]
+
+    page, next_cursor = page_of(rows, PageParams(limit=3), created_key)
+    assert [r.id for r in page] == [1, 2, 3]
+    assert next_cursor is None
+
+
+def test_walking_the_cursor_visits_every_row_once(client, tables):
+    tables(users, teachers)
+    with engine.begin() as conn:
+        conn.execute(insert(users.__table__), [{"firebase_uid": f"uid-{i}", "email": f"t{i}@example.com"} for i in range(5)])
+        # one created_at for all, so the id has to break the ties
+        conn.execute(insert(teachers.__table__), [{"user_id": i + 1, "created_at": datetime(2026, 1, 1)} for i in range(5)])
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/teachers/", params=params)
+        assert response.status_code == 200
+        pages.append([t["id"] for t in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert pages == [[1, 2], [3, 4], [5]]
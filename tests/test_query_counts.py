@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import insert, select
+
+from app.core.config import settings
+from app.db.instrumentation import QueryStats, assert_max_queries
+from app.db.session import engine
+from app.models.models import batches, enrollments, users
+
+
+@pytest.fixture
+def students(tables):
+    tables(users, batches, enrollments)
+    with engine.begin() as conn:
+        conn.execute(insert(batches.__table__), [{"name": f"batch {i}"} for i in range(3)])
+        conn.execute(insert(users.__table__), [{"firebase_uid": f"uid-{i}", "email": f"s{i}@example.com"} for i in range(20)])
+        conn.execute(insert(enrollments.__table__), [
+            {"batch_id": b + 1, "student_id": s + 1, "is_active": True} for s in range(20) for b in range(3)
+        ])
+
+
+def test_list_students_is_one_query_per_page(client, students):
+    with assert_max_queries(1) as stats:
+        response = client.get("/students/", params={"limit": 50})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 20
+    assert all(len(s["enrollments"]) == 3 for s in response.json())
+    assert stats.count == 1
+
+
+def test_assert_max_queries_reports_the_statements(students):
+    with pytest.raises(AssertionError, match=r"Expected at most 2 queries, got 3"):
+        with assert_max_queries(2):
+            with engine.connect() as conn:
+                for i in range(3):
+                    conn.execute(select(users.id).where(users.id == i))
+
+
+def test_repeated_statement_is_flagged_as_n_plus_one():
+    stats = QueryStats()
+    for _ in range(settings.N_PLUS_ONE_THRESHOLD):
+        stats.record("SELECT * FROM enrollments WHERE student_id = ?", 0.001)
+    stats.record("SELECT * FROM users", 0.002)
+
+    assert stats.repeated() == [("SELECT * FROM enrollments WHERE student_id = ?", settings.N_PLUS_ONE_THRESHOLD)]
+    assert stats.summary()["db_queries"] == settings.N_PLUS_ONE_THRESHOLD + 1
+
+
+def test_middleware_reports_query_count_in_debug(client, students, monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG", True)
+    response = client.get("/students/")
+
+    assert response.headers["X-DB-Query-Count"] == "1"
+    assert response.headers["X-DB-Repeated-Statements"] == "0"
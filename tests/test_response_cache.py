@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from app.core.response_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+
+    def advance(seconds):
+        now[0] += seconds
+
+    return advance
+
+
+def test_hit_after_set(clock):
+    cache = ResponseCache(ttl=60)
+    _, token = cache.get(1, "page")
+    cache.set(1, ("page",), "body", token)
+
+    assert cache.get(1, "page")[0] == "body"
+
+
+def test_set_after_an_invalidate_is_dropped(clock):
+    cache = ResponseCache(ttl=60)
+    _, token = cache.get(1, "page")
+    cache.invalidate(1)
+    cache.set(1, ("page",), "stale body", token)
+
+    assert cache.get(1, "page")[0] is None
+
+
+def test_invalidate_only_touches_its_scope(clock):
+    cache = ResponseCache(ttl=60)
+    for scope in (1, 2):
+        _, token = cache.get(scope, "page")
+        cache.set(scope, ("page",), f"body {scope}", token)
+    cache.invalidate(1)
+
+    assert cache.get(1, "page")[0] is None
+    assert cache.get(2, "page")[0] == "body 2"
+
+
+def test_nothing_is_stored_while_the_scope_settles(clock):
+    cache = ResponseCache(ttl=60, settle=5)
+    cache.invalidate(1)
+    clock(4)
+    _, token = cache.get(1, "page")
+    cache.set(1, ("page",), "body", token)
+    assert cache.get(1, "page")[0] is None
+
+    clock(1)
+    _, token = cache.get(1, "page")
+    cache.set(1, ("page",), "body", token)
+    assert cache.get(1, "page")[0] == "body"
+
+
+def test_entry_expires_on_time(clock):
+    cache = ResponseCache(ttl=60)
+    _, token = cache.get(1, "page")
+    cache.set(1, ("page",), "body", token)
+
+    clock(59.9)
+    assert cache.get(1, "page")[0] == "body"
+    clock(0.1)
+    assert cache.get(1, "page")[0] is None
+
+
+def test_lookup_older_than_ttl_is_not_stored(clock):
+    cache = ResponseCache(ttl=60)
+    _, token = cache.get(1, "page")
+    clock(60)
+    cache.set(1, ("page",), "body", token)
+
+    assert cache.get(1, "page")[0] is None
+
+
+def test_scope_is_pruned_after_ttl_and_settle(clock):
+    cache = ResponseCache(ttl=60, settle=5)
+    cache.invalidate(1)
+    assert cache.stats()["scopes"] == 1
+
+    # pruning runs from invalidate, at most once per ttl
+    clock(64)
+    cache.invalidate(2)
+    assert cache.stats()["scopes"] == 2
+
+    # scope 1 is 124s past its invalidation, scope 2 only 60s
+    clock(60)
+    cache.invalidate(3)
+    assert cache.stats()["scopes"] == 2
+    assert cache.get(1, "page")[1][0] == 0
+    assert cache.get(2, "page")[1][0] != 0
+
+
+def test_invalidation_from_another_worker(clock):
+    cache = ResponseCache(ttl=60, topic="test-cache")
+    _, token = cache.get(1, "page")
+    cache.set(1, ("page",), "body", token)
+
+    cache._invalidated_elsewhere({"event": "invalidate", "data": {"origin": "another worker", "scopes": [1]}})
+    assert cache.get(1, "page")[0] is None
+
+    # its own message coming back is ignored
+    _, token = cache.get(1, "page")
+    cache.set(1, ("page",), "body", token)
+    cache._invalidated_elsewhere({"event": "invalidate", "data": {"origin": cache.origin, "scopes": [1]}})
+    assert cache.get(1, "page")[0] == "body"
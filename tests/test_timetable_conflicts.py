@@ -0,0 +1,86 @@
+from datetime import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import MetaData, insert
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+
+from app.core.authen import get_current_user
+from app.core.identity import CurrentUser
+from app.db.session import engine
+from app.main import app
+from app.models.models import RoleEnum, batch_deletions, batches, teachers, timetable_slots, users
+from app.routes.timetable import find_conflicts
+
+
+def slot(teacher_id, class_id, start, end, day="mon"):
+    return SimpleNamespace(teacher_id=teacher_id, class_id=class_id, day=day, start_time=time(start), end_time=time(end))
+
+
+def conflicting(slots):
+    return [(field, slots.index(a), slots.index(b)) for field, a, b in find_conflicts(slots)]
+
+
+def test_back_to_back_slots_do_not_conflict():
+    assert conflicting([slot(1, 1, 9, 10), slot(1, 1, 10, 11), slot(1, 1, 11, 12)]) == []
+
+
+def test_overlapping_slots_of_one_teacher_conflict():
+    assert conflicting([slot(1, 1, 9, 11), slot(1, 2, 10, 12)]) == [("teacher_id", 0, 1)]
+
+
+def test_overlapping_slots_of_one_class_conflict():
+    assert conflicting([slot(1, 1, 9, 11), slot(2, 1, 10, 12)]) == [("class_id", 0, 1)]
+
+
+def test_overlap_on_another_day_or_for_someone_else_is_fine():
+    assert conflicting([slot(1, 1, 9, 11), slot(1, 1, 10, 12, day="tue"), slot(2, 2, 10, 12)]) == []
+
+
+def test_a_long_slot_conflicts_with_every_slot_inside_it():
+    assert conflicting([slot(1, 1, 9, 12), slot(1, 2, 9, 10), slot(1, 3, 11, 12)]) == [("teacher_id", 0, 1), ("teacher_id", 0, 2)]
+
+
+@pytest.fixture
+def timetable(tables):
+    tables(users, teachers, batches, batch_deletions)
+    # the overlap exclusions are Postgres-only; the route checks overlaps itself
+    metadata = MetaData()
+    for model in (users, teachers, batches):
+        model.__table__.to_metadata(metadata)
+    slots = timetable_slots.__table__.to_metadata(metadata)
+    for constraint in [c for c in slots.constraints if isinstance(c, ExcludeConstraint)]:
+        slots.constraints.discard(constraint)
+    slots.create(engine)
+
+    with engine.begin() as conn:
+        conn.execute(insert(users.__table__), [{"firebase_uid": "admin", "email": "admin@example.com"}])
+        conn.execute(insert(teachers.__table__), [{"user_id": 1}])
+        conn.execute(insert(batches.__table__), [{"name": "class a"}])
+        conn.execute(insert(timetable_slots.__table__), [
+            {"teacher_id": 1, "class_id": 1, "subject_id": 1, "day": "mon", "start_time": time(9), "end_time": time(10)},
+        ])
+
+    app.dependency_overrides[get_current_user] = lambda: CurrentUser(id=1, firebase_uid="admin", email="admin@example.com", role=RoleEnum.ADMIN, is_active=True)
+    yield
+    app.dependency_overrides.pop(get_current_user, None)
+    slots.drop(engine)
+
+
+def bulk_item(start, end, **extra):
+    return {"teacher_id": 1, "class_id": 1, "subject_id": 1, "day": "mon", "start_time": f"{start:02}:00", "end_time": f"{end:02}:00", **extra}
+
+
+def test_edited_slot_is_checked_with_its_new_times_only(client, timetable):
+    # slot 1 moves away from 9-10, so a new slot can take its old place
+    response = client.post("/timetable/slots:bulk", json={"slots": [bulk_item(10, 11, id=1), bulk_item(9, 10)]})
+
+    assert response.status_code == 200
+    assert [(s["id"], s["start_time"]) for s in response.json()] == [(1, "10:00:00"), (2, "09:00:00")]
+
+
+def test_new_slot_over_a_stored_one_is_rejected(client, timetable):
+    response = client.post("/timetable/slots:bulk", json={"slots": [bulk_item(9, 11)]})
+
+    assert response.status_code == 400
+    assert {"field": "teacher_id", "slots": ["slot 1", "slots[0]"]} in response.json()["detail"]["conflicts"]